@@ -0,0 +1,244 @@
+"""Vectorized estimate of how many clicks and how much time each level takes
+
+Simulates many boards of a level at once as NumPy arrays (requires numpy),
+played by agents with different memory models:
+
+    perfect   remembers every tile it has seen
+    k-recall  remembers only the k most recently flipped tiles
+    decaying  forgets each remembered tile with a fixed chance every turn
+
+    python analysis.py config.json --boards 1000000 --agent k-recall --k 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+AGENTS = ("perfect", "k-recall", "decaying")
+PERCENTILES = (10, 50, 90, 99)
+
+
+def generate_boards(n_boards, cols, rows, tile_types, rng):
+    """Shuffled boards as an (n_boards, rows * cols) array of tile types, -1 for the empty cell
+
+    Matches board.generate_tile_values(): pair i gets type i % tile_types and
+    an odd grid leaves its last cell empty.
+    """
+    total = rows * cols
+    pairs_needed = total // 2
+    values = np.repeat(np.arange(pairs_needed) % tile_types, 2).astype(np.int16)
+    boards = rng.permuted(np.broadcast_to(values, (n_boards, len(values))), axis=1)
+    if total > len(values):
+        boards = np.concatenate([boards, np.full((n_boards, 1), -1, np.int16)], axis=1)
+    return boards
+
+
+def random_cell(mask, rng):
+    """Pick a uniformly random True cell of each row (rows must have at least one)"""
+    weights = rng.random(mask.shape, dtype=np.float32)
+    weights *= mask
+    return weights.argmax(axis=1)
+
+
+def simulate_level(boards, rng, agent="perfect", k=8, forget=0.1, click_time=700, hide_delay=1000):
+    """Play every board to completion and return (clicks, time_ms) arrays
+
+    Each turn the agent flips a remembered pair if it knows one; otherwise it
+    flips an unknown tile and then its remembered partner, or another unknown
+    tile. A mismatch costs `hide_delay` while the tiles flip back.
+
+    Boards are already uniformly shuffled, so the agent explores never-seen
+    tiles in cell order; forgotten tiles are picked with their fair share of
+    probability. Finding a remembered pair or partner, and applying the memory
+    model, still work on whole (boards, cells) arrays every turn, and a level
+    takes turns in proportion to its cells, so it costs O(boards x cells^2):
+    going from 4x4 to 8x9 boards is about 7x slower per board for the perfect
+    agent and 15x for k-recall.
+    """
+    n_boards, n_cells = boards.shape
+    tile_types = int(boards.max()) + 1
+    n_tiles = int((boards[0] >= 0).sum())  # The empty cell of odd grids is the last one
+    clicks = np.zeros(n_boards, np.int64)
+    time_ms = np.zeros(n_boards, np.int64)
+
+    # Working state of the boards still being played; finished boards are
+    # dropped from these arrays
+    ids = np.arange(n_boards)
+    t = boards
+    done = boards < 0  # The empty cell counts as done
+    known = np.zeros(boards.shape, bool)  # Remembered and not yet matched
+    remembered = np.zeros((n_boards, tile_types), np.int16)  # Remembered tiles per type
+    next_new = np.zeros(n_boards, np.int64)  # Cells from here on were never seen
+    forgotten = np.zeros(n_boards, np.int64)  # Seen, unmatched and no longer remembered
+    unmatched = np.full(n_boards, n_tiles, np.int64)
+    # Flip count at which each remembered tile is forgotten (unused by the perfect agent)
+    expires = np.zeros(boards.shape if agent != "perfect" else (n_boards, 0), np.int32)
+    turns = np.zeros(n_boards, np.int64)
+    mismatches = np.zeros(n_boards, np.int64)
+    flips = 0
+
+    def explore(rows):
+        """Flip a tile the agent doesn't remember on each of the given boards"""
+        cell = next_new[rows].copy()
+        if agent != "perfect":
+            fresh = n_tiles - next_new[rows]
+            old = forgotten[rows]
+            pick_old = rng.random(rows.size) * (fresh + old) < old
+            if pick_old.any():
+                r = rows[pick_old]
+                mask = ~(known[r] | done[r]) & (np.arange(n_cells)[None, :] < next_new[r, None])
+                cell[pick_old] = random_cell(mask, rng)
+                forgotten[r] -= 1
+            next_new[rows[~pick_old]] += 1
+        else:
+            next_new[rows] += 1
+        return cell
+
+    def see(rows, cell, flip):
+        """Remember flipped tiles, counting the ones that weren't remembered yet"""
+        new = ~known[rows, cell]
+        known[rows, cell] = True
+        remembered[rows[new], t[rows[new], cell[new]]] += 1
+        if agent == "k-recall":
+            # Pushed out of memory by the k-th newer flip
+            expires[rows, cell] = flip + k + 1
+        elif agent == "decaying":
+            # Survives each further turn with probability 1 - forget
+            expires[rows, cell] = flip - flip % 2 + 2 + 2 * rng.geometric(forget, rows.size)
+
+    def forget_tiles(mask):
+        rows, cell = np.nonzero(mask)
+        known[rows, cell] = False
+        np.subtract.at(remembered, (rows, t[rows, cell]), 1)
+        forgotten[:] += np.bincount(rows, minlength=len(forgotten))
+
+    while ids.size:
+        rows = np.arange(ids.size)
+        first = np.empty(ids.size, np.int64)
+        second = np.empty(ids.size, np.int64)
+
+        # First flip: one of a known pair, else a tile the agent doesn't remember
+        pair = remembered >= 2
+        has_pair = pair.any(axis=1)
+        r = rows[has_pair]
+        pair_type = pair[r].argmax(axis=1).astype(t.dtype)
+        first[r] = (known[r] & (t[r] == pair_type[:, None])).argmax(axis=1)
+        first[~has_pair] = explore(rows[~has_pair])
+        first_type = t[rows, first]
+        see(rows, first, flips)
+
+        # Second flip: a remembered partner of the first tile, else another unknown one
+        # (when every unmatched tile is remembered the partner always is)
+        has_partner = remembered[rows, first_type] >= 2
+        r = rows[has_partner]
+        partner = known[r] & (t[r] == first_type[r, None])
+        partner[np.arange(r.size), first[r]] = False
+        second[r] = partner.argmax(axis=1)
+        second[~has_partner] = explore(rows[~has_partner])
+        see(rows, second, flips + 1)
+
+        is_match = t[rows, second] == first_type
+        turns += 1
+        mismatches += ~is_match
+        hit = rows[is_match]
+        for cell in (first[is_match], second[is_match]):
+            done[hit, cell] = True
+            known[hit, cell] = False
+        remembered[hit, first_type[is_match]] -= 2
+        unmatched[hit] -= 2
+
+        # Apply the memory model
+        flips += 2
+        if agent != "perfect":
+            forget_tiles(known & (expires <= flips))
+
+        finished = unmatched == 0
+        if finished.any():
+            clicks[ids[finished]] = 2 * turns[finished]
+            time_ms[ids[finished]] = 2 * click_time * turns[finished] + hide_delay * mismatches[finished]
+            keep = ~finished
+            ids, t, done, known, remembered = ids[keep], t[keep], done[keep], known[keep], remembered[keep]
+            next_new, forgotten, unmatched = next_new[keep], forgotten[keep], unmatched[keep]
+            expires, turns, mismatches = expires[keep], turns[keep], mismatches[keep]
+
+    return clicks, time_ms
+
+
+def simulate_chunk(cols, rows, tile_types, n_boards, seed, agent, k, forget, click_time):
+    rng = np.random.default_rng(seed)
+    boards = generate_boards(n_boards, cols, rows, tile_types, rng)
+    return simulate_level(boards, rng, agent, k, forget, click_time)
+
+
+def analyze(config, n_boards=100000, agent="perfect", k=8, forget=0.1, click_time=700,
+            seed=0, chunk_size=100000, workers=1):
+    """Simulate every configured level and report click and time percentiles
+
+    Chunks of boards are spread over `workers` processes, each with its own
+    random stream spawned from `seed`.
+    """
+    levels = config["grid_sizes"][:config["num_levels"]]
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(levels) * (n_boards // chunk_size + 1)))
+    jobs, job_levels = [], []
+    for level, (cols, rows) in enumerate(levels, start=1):
+        for start in range(0, n_boards, chunk_size):
+            jobs.append((cols, rows, config["tile_types"], min(chunk_size, n_boards - start),
+                         next(seeds), agent, k, forget, click_time))
+            job_levels.append(level)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(simulate_chunk, *zip(*jobs)))
+    else:
+        results = [simulate_chunk(*job) for job in jobs]
+
+    duration_ms = config["level_duration"] * 1000
+    report = []
+    for level, (cols, rows) in enumerate(levels, start=1):
+        chunks = [result for job_level, result in zip(job_levels, results) if job_level == level]
+        clicks = np.concatenate([c for c, _ in chunks])
+        time_ms = np.concatenate([t for _, t in chunks])
+        seconds = time_ms / 1000
+
+        entry = {"level": level, "grid": [cols, rows], "boards": n_boards,
+                 "within_duration": float((time_ms <= duration_ms).mean())}
+        for p, c, s in zip(PERCENTILES, np.percentile(clicks, PERCENTILES),
+                           np.percentile(seconds, PERCENTILES)):
+            entry[f"clicks_p{p}"] = float(c)
+            entry[f"seconds_p{p}"] = float(s)
+        report.append(entry)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate clicks and time per level")
+    parser.add_argument("config", nargs="?", default="config.json")
+    parser.add_argument("--boards", type=int, default=100000, help="boards simulated per level")
+    parser.add_argument("--agent", choices=AGENTS, default="perfect")
+    parser.add_argument("--k", type=int, default=8, help="tiles remembered by the k-recall agent")
+    parser.add_argument("--forget", type=float, default=0.1,
+                        help="chance per turn the decaying agent forgets a tile")
+    parser.add_argument("--click-time", type=int, default=700, help="milliseconds per click")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+
+    started = time.perf_counter()
+    report = analyze(config, args.boards, args.agent, args.k, args.forget, args.click_time,
+                     args.seed, workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    json.dump(report, sys.stdout, indent=2)
+    total = args.boards * len(report)
+    print(f"\n{total} boards in {elapsed:.2f}s ({total / elapsed:.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
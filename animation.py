@@ -0,0 +1,146 @@
+"""Tile flip, match pulse and level clear animations timed on the game clock
+
+An animation's progress comes from the time elapsed since it started, so it
+takes as long and looks the same at any frame rate. Frames are quantized to a
+few steps, each baked once into a surface covering the tile and the gap around
+it with the background filled in. A frame of any number of animating tiles is
+then just one Surface.blits() call.
+"""
+import math
+
+import pygame
+
+FLIP_MS = 160  # Turning a tile over, half of it edge-on towards the middle
+PULSE_MS = 300  # The brightness flash of a matched pair
+CLEAR_STAGGER_MS = 40  # Delay between the diagonals of the level clear wave
+FLIP_STEPS = 6  # Distinct tile widths per half of a flip
+PULSE_STEPS = 5  # Distinct brightness levels of a pulse
+PULSE_BRIGHTNESS = 90  # Added to each color channel at the peak of a pulse
+
+
+class Animation:
+    __slots__ = ("cell", "kind", "start", "end", "to_face", "calls")
+
+    def __init__(self, cell, kind, start, end, to_face=False):
+        self.cell = cell
+        self.kind = kind  # "flip" or "pulse"
+        self.start = start
+        self.end = end
+        self.to_face = to_face  # Direction of a flip
+        self.calls = ()  # The scheduled calls that start and finish it
+
+
+class Animator:
+    """Tile animations whose start and end are calls on the session's scheduler
+
+    Animations of one tile play one after another, so a tile that is flipped
+    face up and matched right away flips, then pulses. Between the scheduled
+    boundaries nothing has to happen, so frames are only needed while
+    `playing` isn't empty.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.clock = scheduler.clock
+        self.pending = set()  # Animations that haven't finished, playing or waiting to start
+        self.playing = set()
+        self.stopped = set()  # Cells whose animation finished, to be drawn at rest again
+        self.ends = {}  # (row, col) -> tick the last animation queued on it ends
+
+    def __bool__(self):
+        return bool(self.pending)
+
+    def add(self, cell, kind, duration, start=None, to_face=False):
+        """Play an animation on a tile at tick `start` (now by default), or once the tile's queue ends"""
+        start = self.clock() if start is None else start
+        start = max(start, self.ends.get(cell, start))
+        animation = Animation(cell, kind, start, start + duration, to_face)
+        animation.calls = (self.scheduler.call_at(start, self.begin, animation),
+                           self.scheduler.call_at(animation.end, self.finish, animation))
+        self.pending.add(animation)
+        self.ends[cell] = animation.end
+
+    def flip(self, cell, to_face):
+        self.add(cell, "flip", FLIP_MS, to_face=to_face)
+
+    def pulse(self, cell, start=None):
+        self.add(cell, "pulse", PULSE_MS, start)
+
+    def begin(self, animation):
+        self.playing.add(animation)
+
+    def finish(self, animation):
+        self.playing.discard(animation)
+        self.pending.discard(animation)
+        self.stopped.add(animation.cell)
+        if self.ends.get(animation.cell) == animation.end:
+            del self.ends[animation.cell]
+
+    def clear(self):
+        """Drop every animation, cancelling their scheduled calls"""
+        for animation in self.pending:
+            for call in animation.calls:
+                self.scheduler.cancel(call)
+        self.pending = set()
+        self.playing = set()
+        self.stopped = set()
+        self.ends = {}
+
+    def next_boundary(self):
+        """Tick at which the next animation starts or ends, or None if there are none"""
+        return min((animation.end if animation in self.playing else animation.start
+                    for animation in self.pending), default=None)
+
+    def step(self):
+        """Return the animations playing now as (cell, animation, progress 0-1), and the
+        cells that stopped animating, which have to be drawn in their resting state again"""
+        now = self.clock()
+        playing = [(animation.cell, animation, (now - animation.start) / (animation.end - animation.start))
+                   for animation in self.playing]
+        stopped, self.stopped = self.stopped, set()
+        return playing, stopped
+
+
+def flip_frame(animation, progress):
+    """Which side of the tile shows (True for the face) and the step of its width"""
+    if progress < 0.5:
+        face, width = not animation.to_face, 1 - 2 * progress
+    else:
+        face, width = animation.to_face, 2 * progress - 1
+    return face, round(width * FLIP_STEPS)
+
+
+def pulse_frame(progress):
+    """Brightness step of a pulse, rising and falling back to 0"""
+    return round(math.sin(math.pi * progress) * PULSE_STEPS)
+
+
+def bake_matched(tile, gap, highlight, background):
+    """A matched tile with its highlight frame, the way it rests on the board"""
+    size = tile.get_width()
+    surface = pygame.Surface((size + gap, size + gap))
+    surface.fill(background)
+    pygame.draw.rect(surface, highlight, surface.get_rect(), 3)
+    surface.blit(tile, (gap // 2, gap // 2))
+    return surface
+
+
+def bake_flip(tile, gap, background, step):
+    """A tile squeezed horizontally to step / FLIP_STEPS of its width, as seen mid-flip"""
+    size = tile.get_width()
+    surface = pygame.Surface((size + gap, size + gap))
+    surface.fill(background)
+    width = size * step // FLIP_STEPS
+    if width > 0:
+        squeezed = pygame.transform.scale(tile, (width, size))
+        surface.blit(squeezed, ((size + gap - width) // 2, gap // 2))
+    return surface
+
+
+def bake_pulse(matched, gap, step):
+    """A matched tile brightened by step / PULSE_STEPS of the peak pulse brightness"""
+    surface = matched.copy()
+    amount = PULSE_BRIGHTNESS * step // PULSE_STEPS
+    inner = surface.get_rect().inflate(-gap, -gap)
+    surface.fill((amount, amount, amount), inner, special_flags=pygame.BLEND_RGB_ADD)
+    return surface
@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+# Image formats tried for each tile, in order of preference
+IMAGE_EXTENSIONS = ("webp", "png", "jpg", "jpeg", "bmp")
+
+
+def discover_tile_images(assets_folder, count):
+    """Find the image file for tile0..tile{count-1}, whatever format it was shipped in
+
+    Returns a list with a path (or None if no image exists) for every tile.
+    """
+    try:
+        available = set(os.listdir(assets_folder))
+    except OSError:
+        available = set()
+
+    paths = []
+    for i in range(count):
+        path = None
+        for ext in IMAGE_EXTENSIONS:
+            name = f"tile{i}.{ext}"
+            if name in available:
+                path = os.path.join(assets_folder, name)
+                break
+        paths.append(path)
+    return paths
+
+
+def load_image(path):
+    """Decode an image file, returning None if it can't be read"""
+    try:
+        return pygame.image.load(path)
+    except (pygame.error, OSError) as e:
+        print(f"Warning: Could not load {path}: {e}")
+        return None
+
+
+def create_tile_back(size=200):
+    """Create the back-of-tile image (used when tile is face down)"""
+    tile_back = pygame.Surface((size, size))
+    tile_back.fill((115, 79, 150))  # Purple color
+    inner_rect = pygame.Rect(10, 10, size-20, size-20)
+    pygame.draw.rect(tile_back, (0, 0, 0), inner_rect, 5)  # Border
+    return tile_back
+
+
+class AssetLoader:
+    """Decode tile images on a worker pool, handing each one out as soon as it is ready
+
+    With eager=False nothing is decoded until start() is called or an image is
+    asked for, which is used when the tiles can be served from the baked atlas.
+    """
+
+    def __init__(self, assets_folder, count, workers=None, eager=True):
+        self.paths = discover_tile_images(assets_folder, count)
+        self.executor = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1),
+                                           thread_name_prefix="asset-loader")
+        self.futures = [None] * count
+        self.lock = threading.Lock()
+        if eager:
+            self.start()
+
+    def __len__(self):
+        return len(self.paths)
+
+    def start(self):
+        """Queue every image for decoding"""
+        for i in range(len(self.paths)):
+            self.request(i)
+
+    def request(self, i):
+        """Queue one image for decoding unless it already is"""
+        with self.lock:
+            if self.futures[i] is None and self.paths[i]:
+                self.futures[i] = self.executor.submit(load_image, self.paths[i])
+            return self.futures[i]
+
+    def is_ready(self, i):
+        future = self.futures[i]
+        return self.paths[i] is None or (future is not None and future.done())
+
+    def image(self, i):
+        """Return the decoded image for tile i, waiting for it if needed (None if missing)"""
+        future = self.request(i)
+        return future.result() if future else None
+
+    def missing(self):
+        """Indices of the tiles that have no image file"""
+        return [i for i, path in enumerate(self.paths) if path is None]
+
+    def adopt(self, other):
+        """Take over the images another loader decoded, or is decoding, from the same files"""
+        with self.lock, other.lock:
+            for i, path in enumerate(self.paths[:len(other.paths)]):
+                future = other.futures[i]
+                if path and path == other.paths[i] and future is not None and not future.cancelled():
+                    self.futures[i] = future
+
+    def shutdown(self, cancel=True):
+        """Stop the workers, dropping queued decodes unless `cancel` is False"""
+        self.executor.shutdown(wait=False, cancel_futures=cancel)
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import mmap
+import os
+import sys
+import threading
+from concurrent.futures import CancelledError
+
+import pygame
+
+from assets import AssetLoader, create_tile_back
+from board import compute_tile_size
+from surface_cache import BACK
+
+# Bump when the atlas layout or the tile drawing code changes
+ATLAS_VERSION = 1
+ATLAS_FORMAT = "RGBA"
+
+
+def tile_sizes_for_config(config):
+    """Every tile size the configured levels use"""
+    width, height = config["window_width"], config["window_height"]
+    return sorted({compute_tile_size(width, height, cols, rows)
+                   for cols, rows in config["grid_sizes"][:config["num_levels"]]})
+
+
+def atlas_digest(config, image_paths):
+    """Hash the inputs of the baked atlas: the image files and the config values that size tiles"""
+    digest = hashlib.blake2b(digest_size=16)
+    settings = {
+        "version": ATLAS_VERSION,
+        "tile_sizes": tile_sizes_for_config(config),
+        "tile_types": config["tile_types"],
+    }
+    digest.update(json.dumps(settings, sort_keys=True).encode())
+    for path in image_paths:
+        digest.update(os.path.basename(path or "").encode() + b"\0")
+        if path:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def atlas_paths(cache_folder, digest):
+    base = os.path.join(cache_folder, f"tiles-{digest}")
+    return base + ".atlas", base + ".json"
+
+
+class TileAtlas:
+    """Pre-scaled tiles memory-mapped from the baked atlas file
+
+    Each tile size is stored as one raw RGBA strip (tile types in order, tile
+    back last), wrapped as a surface straight from the mapped file.
+    """
+
+    def __init__(self, index, data_file):
+        self.index = index
+        self.data_file = data_file
+        self.data = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.strips = {}
+
+    @classmethod
+    def load(cls, cache_folder, digest):
+        """Open the atlas baked for digest, or return None if there isn't a valid one"""
+        data_path, index_path = atlas_paths(cache_folder, digest)
+        try:
+            with open(index_path, "r") as f:
+                index = json.load(f)
+            if index.get("version") != ATLAS_VERSION or index.get("digest") != digest:
+                return None
+            data_file = open(data_path, "rb")
+        except (OSError, ValueError):
+            return None
+
+        if os.fstat(data_file.fileno()).st_size != index["data_size"]:
+            data_file.close()
+            return None
+        return cls(index, data_file)
+
+    def tile_sizes(self):
+        return [int(size) for size in self.index["sizes"]]
+
+    def strip(self, size):
+        """Surface over the mapped strip of all tiles at one size"""
+        strip = self.strips.get(size)
+        if strip is None:
+            entry = self.index["sizes"].get(str(size))
+            if entry is None:
+                return None
+            end = entry["offset"] + entry["width"] * entry["height"] * 4
+            buffer = memoryview(self.data)[entry["offset"]:end]
+            strip = pygame.image.frombuffer(buffer, (entry["width"], entry["height"]), ATLAS_FORMAT)
+            self.strips[size] = strip
+        return strip
+
+    def lookup(self, key):
+        """Return the baked surface for a (tile type, size, variant) cache key, or None"""
+        tile_type, size, variant = key
+        entry = self.index["sizes"].get(str(size))
+        if entry is None:
+            return None
+        slot = entry["slots"].get("back" if tile_type == BACK else str(tile_type))
+        if slot is None or variant not in ("face", "back"):
+            return None
+        surface = self.strip(size).subsurface((slot * size, 0, size, size))
+        return surface, tile_type in self.index["opaque"] or tile_type == BACK
+
+    def close(self):
+        self.strips = {}
+        self.data.close()
+        self.data_file.close()
+
+
+def bake_atlas(cache_folder, digest, tile_images, tile_back, tile_sizes):
+    """Write every tile and the tile back at each size to one raw atlas file plus a JSON index
+
+    tile_images maps tile type to its source image; missing types are left out
+    and scaled at runtime from the fallback tile instead.
+    """
+    os.makedirs(cache_folder, exist_ok=True)
+    data_path, index_path = atlas_paths(cache_folder, digest)
+    types = sorted(tile_images)
+
+    index = {
+        "version": ATLAS_VERSION,
+        "digest": digest,
+        "format": ATLAS_FORMAT,
+        "opaque": [i for i in types if not tile_images[i].get_flags() & pygame.SRCALPHA],
+        "sizes": {},
+    }
+
+    offset = 0
+    tmp_data_path = data_path + ".tmp"
+    with open(tmp_data_path, "wb") as f:
+        for size in tile_sizes:
+            sources = [tile_images[i] for i in types] + [tile_back]
+            strip = pygame.Surface((size * len(sources), size), pygame.SRCALPHA)
+            for slot, source in enumerate(sources):
+                strip.blit(pygame.transform.scale(source, (size, size)), (slot * size, 0))
+            data = pygame.image.tobytes(strip, ATLAS_FORMAT)
+            f.write(data)
+
+            slots = {str(i): slot for slot, i in enumerate(types)}
+            slots["back"] = len(types)
+            index["sizes"][str(size)] = {
+                "offset": offset, "width": strip.get_width(), "height": size, "slots": slots,
+            }
+            offset += len(data)
+    index["data_size"] = offset
+
+    # The index is written last, so a half-written atlas is never picked up
+    os.replace(tmp_data_path, data_path)
+    tmp_index_path = index_path + ".tmp"
+    with open(tmp_index_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_index_path, index_path)
+
+    remove_stale_atlases(cache_folder, digest)
+    return data_path
+
+
+def remove_stale_atlases(cache_folder, digest):
+    """Delete atlases baked for other assets or configs"""
+    keep = {os.path.basename(path) for path in atlas_paths(cache_folder, digest)}
+    for name in os.listdir(cache_folder):
+        if name.startswith("tiles-") and name not in keep:
+            try:
+                os.remove(os.path.join(cache_folder, name))
+            except OSError:
+                pass
+
+
+def bake_in_background(cache_folder, digest, asset_loader, tile_back, tile_sizes):
+    """Bake the atlas on a background thread once the asset loader has decoded every image"""
+    def work():
+        images = {}
+        try:
+            for i in range(len(asset_loader)):
+                image = asset_loader.image(i)
+                if image is not None:
+                    images[i] = image
+        except CancelledError:
+            return  # The loader was shut down (the game quit or reloaded its images)
+        try:
+            bake_atlas(cache_folder, digest, images, tile_back, tile_sizes)
+        except (OSError, pygame.error) as e:
+            print(f"Warning: Could not write tile atlas to {cache_folder}: {e}")
+
+    thread = threading.Thread(target=work, name="atlas-bake", daemon=True)
+    thread.start()
+    return thread
+
+
+def main():
+    """Bake the tile atlas offline for a config file (config.json by default)"""
+    config_file = sys.argv[1] if len(sys.argv) > 1 else "config.json"
+    with open(config_file, "r") as f:
+        config = json.load(f)
+
+    cache_folder = config.get("cache_folder", "cache")
+    loader = AssetLoader(config["assets_folder"], config["tile_types"])
+    digest = atlas_digest(config, loader.paths)
+    tile_sizes = tile_sizes_for_config(config)
+
+    images = {i: loader.image(i) for i in range(len(loader))}
+    images = {i: image for i, image in images.items() if image is not None}
+    path = bake_atlas(cache_folder, digest, images, create_tile_back(), tile_sizes)
+    loader.shutdown()
+    print(f"Baked {len(images)} tiles at sizes {tile_sizes} into {path}")
+
+
+if __name__ == "__main__":
+    main()
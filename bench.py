@@ -0,0 +1,271 @@
+"""Headless benchmarks for loading, level setup, hit-testing and drawing
+
+Runs on the SDL dummy video driver, writes the results as JSON and can
+compare them against a stored baseline:
+
+    python bench.py --output baseline.json
+    python bench.py --compare baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import pygame
+
+from board import Board, generate_tile_values
+from game import TileMatchingGame, load_config_from_file
+
+SYNTHETIC_GRIDS = [(50, 50), (100, 100)]
+STATES = ("start", "playing", "level_completing", "level_complete", "game_over", "game_complete")
+
+
+def measure(fn, repeat=5, number=1):
+    """Median and best time per call of fn in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - start) / number)
+    return {"median": statistics.median(times), "min": min(times)}
+
+
+def make_game(config):
+    game = TileMatchingGame(config)
+    for i in range(len(game.tile_images)):
+        game.tile_image(i)
+    return game
+
+
+def go_to_level(game, level):
+    game.reset_game()
+    game.current_level = level
+    game.initialize_grid()
+
+
+def bench_loading(config, results):
+    cold_config = dict(config, tile_atlas=False)
+    game = TileMatchingGame(cold_config)
+
+    def load_cold():
+        game.asset_loader.shutdown()
+        game.load_tile_images()
+        for i in range(len(game.tile_images)):
+            game.tile_image(i)
+    results["load_tile_images_cold"] = measure(load_cold, repeat=3)
+
+    with tempfile.TemporaryDirectory() as cache_folder:
+        warm_config = dict(config, tile_atlas=True, cache_folder=cache_folder)
+        game = TileMatchingGame(warm_config)
+        # The first run bakes the atlas; wait for it to land on disk
+        deadline = time.time() + 60
+        while not any(name.endswith(".json") for name in os.listdir(cache_folder)):
+            if time.time() > deadline:
+                break
+            time.sleep(0.05)
+
+        def load_warm():
+            game.asset_loader.shutdown()
+            game.surface_cache.clear()
+            game.load_tile_images()
+            for level in range(1, game.config["num_levels"] + 1):
+                for key in game.level_tile_keys(level):
+                    game.surface_cache.get(key, game.tile_back)
+        results["load_tile_images_warm"] = measure(load_warm, repeat=3)
+        if game.tile_atlas:
+            game.tile_atlas.close()
+
+
+def bench_levels(game, grids, results):
+    for level, (cols, rows) in enumerate(grids, start=1):
+        name = f"{cols}x{rows}"
+        game.current_level = level
+        game.initialize_grid()  # Warm the surface cache for this size
+        results[f"initialize_grid[{name}]"] = measure(game.initialize_grid, repeat=7)
+
+        # Click random tiles; only the clicks are timed, not the board resets between them
+        cells = list(game.grid.cells())
+        rng = random.Random(level)
+        positions = []
+        for _ in range(1000):
+            x, y, w, h = game.grid.tile_rect(*rng.choice(cells))
+            positions.append((x + w // 2, y + h // 2))
+
+        def clicks():
+            total = 0.0
+            for pos in positions:
+                if game.state != "playing" or len(game.selected_tiles) == 2:
+                    game.hide_selected_tiles()
+                    if game.state != "playing":
+                        game.initialize_grid()
+                        game.state = "playing"
+                game.clock.advance(500)  # Lets the previous click's animations finish
+                start = time.perf_counter()
+                game.handle_click(pos)
+                total += time.perf_counter() - start
+            return total / len(positions)
+
+        game.state = "playing"
+        times = [clicks() for _ in range(5)]
+        results[f"handle_click[{name}]"] = {"median": statistics.median(times), "min": min(times)}
+
+        game.state = "playing"
+        results[f"draw_grid[{name}]"] = measure(game.draw_grid, repeat=7)
+
+
+def bench_frames(game, results):
+    go_to_level(game, game.config["num_levels"])
+    for state in STATES:
+        def frame():
+            game.state = state
+            game.renderer.invalidate()
+            game.static_screens.clear()
+            game.draw_screen()
+            game.renderer.present()
+        results[f"full_frame[{state}]"] = measure(frame, repeat=7)
+
+        # A frame in which nothing changed
+        game.state = state
+        game.draw_screen()
+        game.renderer.present()
+
+        def idle_frame():
+            game.draw_screen()
+            game.renderer.present()
+        results[f"idle_frame[{state}]"] = measure(idle_frame, repeat=7, number=20)
+
+
+def bench_level_clear(game, results):
+    """Frames of the level clear wave on the last level's board, on a 60 FPS virtual clock"""
+    go_to_level(game, game.config["num_levels"])
+    game.draw_screen()
+    game.renderer.present()
+    for cell in game.grid.cells():
+        game.grid.reveal(*cell)
+        game.grid.match(*cell)
+    game.frame_cache.clear()  # The first clear bakes its frames, later ones reuse them
+    game.complete_level()
+
+    times = []
+    while game.animator:
+        game.clock.advance(16)
+        game.scheduler.advance()  # Starts and finishes the animations due by now
+        start = time.perf_counter()
+        game.draw_screen()
+        game.renderer.present()
+        times.append(time.perf_counter() - start)
+    cols, rows = game.grid.cols, game.grid.rows
+    results[f"level_clear_frame[{cols}x{rows}]"] = {"median": statistics.median(times), "min": min(times),
+                                                   "max": max(times)}
+
+
+def bench_memory(config, grids, results):
+    for cols, rows in grids:
+        values = generate_tile_values(cols, rows, config["tile_types"], random.Random(0))
+        tracemalloc.start()
+        board = Board(rows, cols, values)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del board
+        results[f"board_bytes[{cols}x{rows}]"] = size
+
+
+def run_benchmarks(config):
+    results = {}
+    bench_loading(config, results)
+
+    grids = [tuple(g) for g in config["grid_sizes"][:config["num_levels"]]] + SYNTHETIC_GRIDS
+    bench_config = dict(config, grid_sizes=grids, num_levels=len(grids))
+    bench_config["secret_texts"] = list(config["secret_texts"]) + [""] * len(SYNTHETIC_GRIDS)
+    game = make_game(bench_config)
+    bench_levels(game, grids, results)
+    game.config = dict(config)
+    game.revealed_texts = list(config["secret_texts"])
+    bench_frames(game, results)
+    bench_level_clear(game, results)
+    bench_memory(config, grids, results)
+    return results
+
+
+def compare(results, baseline, threshold, min_delta=1e-5):
+    """List metrics that got slower (or bigger) than the baseline by more than threshold
+
+    Timings are compared by their best run, and slowdowns under `min_delta`
+    seconds are ignored as noise.
+    """
+    regressions = []
+    for name, value in results.items():
+        if name not in baseline:
+            continue
+        if isinstance(value, dict):
+            new, old = value["min"], baseline[name]["min"]
+            if new - old < min_delta:
+                continue
+        else:
+            new, old = value, baseline[name]
+        if old > 0 and new > old * (1 + threshold):
+            regressions.append((name, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game headless")
+    parser.add_argument("config", nargs="?", default="config.json")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="baseline results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed slowdown against the baseline (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=1e-5,
+                        help="slowdowns under this many seconds are ignored")
+    args = parser.parse_args()
+
+    config = load_config_from_file(args.config)
+    if config is None:
+        sys.exit(1)
+    config["snapshots"] = False  # Don't resume or overwrite a saved session
+
+    # Atlases and the font cache go to a scratch folder, so the game's own cache is left alone
+    # (baking an atlas for the benchmark's grid sizes would delete the game's atlas)
+    with tempfile.TemporaryDirectory() as cache_folder:
+        config["cache_folder"] = cache_folder
+        results = {
+            "meta": {"python": sys.version.split()[0], "pygame": pygame.version.ver,
+                     "config": args.config, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+            "results": run_benchmarks(config),
+        }
+        # Let atlases still being baked finish before their folder goes away
+        for thread in threading.enumerate():
+            if thread.name == "atlas-bake":
+                thread.join()
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for name, value in results["results"].items():
+        if isinstance(value, dict):
+            print(f"{name:40s} {value['median'] * 1000:10.3f} ms")
+        else:
+            print(f"{name:40s} {value:10d} bytes")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results["results"], baseline, args.threshold, args.min_delta)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.6g} -> {new:.6g} ({new / old - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import random
+import sys
+from array import array
+
+EMPTY = -1  # Type of a cell that holds no tile (odd-sized grids)
+
+
+def generate_tile_values(cols, rows, tile_types, rng=random):
+    """Create the shuffled list of tile types for a cols x rows grid
+
+    Each pair gets type `i % tile_types`, so types repeat once the grid
+    needs more pairs than there are tile types.
+    """
+    tile_values = []
+    pairs_needed = (rows * cols) // 2
+
+    for i in range(pairs_needed):
+        tile_type = i % tile_types
+        tile_values.append(tile_type)
+        tile_values.append(tile_type)
+
+    rng.shuffle(tile_values)
+    return tile_values
+
+
+def compute_tile_size(width, height, cols, rows):
+    """Calculate the tile size that fits a cols x rows grid on a width x height screen"""
+    # Calculate available space - use more of the screen
+    ui_height = 100  # Space for UI elements (top and bottom)
+    game_area_width = width - 40  # 20px padding on each side
+    game_area_height = height - ui_height  # Less space for UI
+
+    # Calculate tile size to maximize usage of available space
+    # Leave a small gap between tiles
+    tile_width = game_area_width // cols - 10
+    tile_height = game_area_height // rows - 10
+    tile_size = min(tile_width, tile_height)
+
+    # Ensure tiles are reasonably sized
+    return max(60, min(tile_size, 300))  # Between 60 and 300px
+
+
+class Board:
+    """Tile state of one level stored in flat arrays, with no pygame dependency
+
+    Cells are addressed by (row, col). Screen geometry is kept as plain numbers
+    so a click position maps to its cell with a couple of divisions.
+    """
+    __slots__ = ("rows", "cols", "types", "revealed", "matched", "unmatched",
+                 "tile_size", "gap", "offset_x", "offset_y")
+
+    def __init__(self, rows, cols, tile_values, tile_size=0, gap=10, offset_x=0, offset_y=0):
+        self.rows = rows
+        self.cols = cols
+        total = rows * cols
+        self.types = array("h", tile_values[:total])
+        self.types.extend([EMPTY] * (total - len(self.types)))
+        self.revealed = bytearray(total)
+        self.matched = bytearray(total)
+        self.unmatched = sum(1 for t in self.types if t != EMPTY)
+
+        self.tile_size = tile_size
+        self.gap = gap
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+
+    def __len__(self):
+        return self.rows * self.cols
+
+    def has_tile(self, r, c):
+        return self.types[r * self.cols + c] != EMPTY
+
+    def type_at(self, r, c):
+        return self.types[r * self.cols + c]
+
+    def is_revealed(self, r, c):
+        return bool(self.revealed[r * self.cols + c])
+
+    def is_matched(self, r, c):
+        return bool(self.matched[r * self.cols + c])
+
+    def reveal(self, r, c):
+        self.revealed[r * self.cols + c] = 1
+
+    def hide(self, r, c):
+        self.revealed[r * self.cols + c] = 0
+
+    def match(self, r, c):
+        i = r * self.cols + c
+        if not self.matched[i]:
+            self.matched[i] = 1
+            self.unmatched -= 1
+
+    def is_complete(self):
+        """All tiles are matched (constant time)"""
+        return self.unmatched == 0
+
+    def cells(self):
+        """Iterate over (row, col) of every cell holding a tile"""
+        cols = self.cols
+        for i, tile_type in enumerate(self.types):
+            if tile_type != EMPTY:
+                yield divmod(i, cols)
+
+    def tile_rect(self, r, c):
+        """Screen rectangle (x, y, width, height) of a cell"""
+        pitch = self.tile_size + self.gap
+        return (self.offset_x + c * pitch, self.offset_y + r * pitch,
+                self.tile_size, self.tile_size)
+
+    def cell_at(self, x, y):
+        """Map a screen position to the (row, col) of the tile under it, or None"""
+        pitch = self.tile_size + self.gap
+        dx = x - self.offset_x
+        dy = y - self.offset_y
+        if dx < 0 or dy < 0 or pitch <= 0:
+            return None
+        c, in_x = divmod(dx, pitch)
+        r, in_y = divmod(dy, pitch)
+        # Positions that fall into the gap between tiles hit nothing
+        if c >= self.cols or r >= self.rows or in_x >= self.tile_size or in_y >= self.tile_size:
+            return None
+        r, c = int(r), int(c)
+        if not self.has_tile(r, c):
+            return None
+        return r, c
+
+    def visible_range(self, x, y, width, height):
+        """Rows and columns (r0, r1, c0, c1) of the tiles intersecting a screen rectangle
+
+        The ranges are half-open and may be empty; they cost the same to
+        compute however large the board is.
+        """
+        pitch = self.tile_size + self.gap
+        if pitch <= 0:
+            return 0, 0, 0, 0
+        # Tile c spans [offset + c * pitch, offset + c * pitch + tile_size)
+        c0 = max(0, (x - self.offset_x - self.tile_size) // pitch + 1)
+        c1 = min(self.cols, -((self.offset_x - x - width) // pitch))
+        r0 = max(0, (y - self.offset_y - self.tile_size) // pitch + 1)
+        r1 = min(self.rows, -((self.offset_y - y - height) // pitch))
+        return r0, max(r0, r1), c0, max(c0, c1)
+
+    def visible_cells(self, x, y, width, height):
+        """Iterate over (row, col) of the tiles intersecting a screen rectangle"""
+        r0, r1, c0, c1 = self.visible_range(x, y, width, height)
+        cols = self.cols
+        types = self.types
+        for r in range(r0, r1):
+            base = r * cols
+            for c in range(c0, c1):
+                if types[base + c] != EMPTY:
+                    yield r, c
+
+    def pack(self):
+        """Tile types (little-endian int16) and matched flags as bytes, for snapshots"""
+        types = array("h", self.types)
+        if sys.byteorder == "big":
+            types.byteswap()
+        return types.tobytes(), bytes(self.matched)
+
+    @classmethod
+    def unpack(cls, rows, cols, types, matched):
+        """Rebuild a board with no tiles face up from the bytes of pack()"""
+        values = array("h")
+        values.frombytes(types)
+        if sys.byteorder == "big":
+            values.byteswap()
+        if len(values) != rows * cols or len(matched) != rows * cols:
+            raise ValueError("board data doesn't match its size")
+        board = cls(rows, cols, values)
+        board.matched = bytearray(matched)
+        board.unmatched = sum(1 for t, m in zip(values, matched) if t != EMPTY and not m)
+        return board
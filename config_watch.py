@@ -0,0 +1,136 @@
+"""Reload the game config while the game runs
+
+ConfigWatcher polls the config file's modification time. A changed file is
+checked against SCHEMA before it's handed to the game, and diff_config()
+tells the game which keys changed so it only rebuilds what depends on them.
+"""
+import json
+import os
+
+from scheduler import monotonic_ms
+
+
+def is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_positive_int(value):
+    return is_int(value) and value > 0
+
+
+def is_color(value):
+    return (isinstance(value, (list, tuple)) and len(value) == 3
+            and all(is_int(c) and 0 <= c <= 255 for c in value))
+
+
+def is_grid_size(value):
+    return (isinstance(value, (list, tuple)) and len(value) == 2
+            and all(is_positive_int(n) for n in value) and value[0] * value[1] >= 2)
+
+
+def is_grid_sizes(value):
+    return isinstance(value, (list, tuple)) and all(is_grid_size(size) for size in value)
+
+
+def is_texts(value):
+    return isinstance(value, (list, tuple)) and all(isinstance(text, str) for text in value)
+
+
+# Required key -> (check, what the value must be)
+SCHEMA = {
+    "window_width": (is_positive_int, "a positive integer"),
+    "window_height": (is_positive_int, "a positive integer"),
+    "num_levels": (is_positive_int, "a positive integer"),
+    "level_duration": (is_positive_int, "a positive number of seconds"),
+    "tile_types": (is_positive_int, "a positive integer"),
+    "grid_sizes": (is_grid_sizes, "a list of [columns, rows] pairs with at least 2 cells each"),
+    "secret_texts": (is_texts, "a list of strings"),
+    "assets_folder": (lambda value: isinstance(value, str) and value != "", "a folder name"),
+    "background_color": (is_color, "an [r, g, b] list of 0-255 values"),
+    "text_color": (is_color, "an [r, g, b] list of 0-255 values"),
+    "highlight_color": (is_color, "an [r, g, b] list of 0-255 values"),
+}
+
+
+def validate_config(config):
+    """List what is wrong with a config; an empty list means it can be used"""
+    if not isinstance(config, dict):
+        return ["the config must be a JSON object"]
+    errors = []
+    for key, (check, expected) in SCHEMA.items():
+        if key not in config:
+            errors.append(f"{key} is missing")
+        elif not check(config[key]):
+            errors.append(f"{key} must be {expected}")
+    if errors:
+        return errors
+
+    levels = config["num_levels"]
+    for key in ("grid_sizes", "secret_texts"):
+        if len(config[key]) < levels:
+            errors.append(f"{key} has {len(config[key])} entries for {levels} levels")
+    return errors
+
+
+def plain(value):
+    """Value with tuples turned into lists, the way it reads back from JSON"""
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    if isinstance(value, dict):
+        return {key: plain(item) for key, item in value.items()}
+    return value
+
+
+def diff_config(old, new):
+    """Set of keys whose values differ between two configs, including added and removed keys"""
+    return {key for key in old.keys() | new.keys()
+            if key not in old or key not in new or plain(old[key]) != plain(new[key])}
+
+
+class ConfigWatcher:
+    """Notice edits to a config file by checking its modification time every `interval` ms
+
+    poll() is cheap to call every frame; it only looks at the file once the
+    interval has passed. A file that doesn't parse or fails validation is
+    reported and skipped, so saving a half-edited config never breaks the game.
+    """
+
+    def __init__(self, path, interval=1000, clock=monotonic_ms):
+        self.path = path
+        self.interval = interval
+        self.clock = clock
+        self.stamp = self.stat()
+        self.next_check = clock() + interval
+
+    def stat(self):
+        try:
+            info = os.stat(self.path)
+        except OSError:
+            return None
+        return (info.st_mtime_ns, info.st_size)
+
+    def poll(self):
+        """Return the new config if the file changed and is valid, otherwise None"""
+        now = self.clock()
+        if now < self.next_check:
+            return None
+        self.next_check = now + self.interval
+
+        stamp = self.stat()
+        if stamp is None or stamp == self.stamp:
+            return None
+        self.stamp = stamp
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not reload {self.path}: {e}")
+            return None
+
+        errors = validate_config(config)
+        if errors:
+            print(f"Warning: Not reloading {self.path}, keeping the running config:")
+            for error in errors:
+                print(f"  {error}")
+            return None
+        return config
@@ -0,0 +1,59 @@
+import json
+import os
+
+import pygame
+
+FONT_CACHE_VERSION = 1
+
+
+class FontResolver:
+    """Resolve system font names to font files once and remember them across launches
+
+    pygame.font.SysFont() builds its table of system fonts on first use, which
+    scans the font directories (fc-list on Linux). The resolved paths are kept
+    in `cache_folder`/fonts.json, so later launches open the font files
+    directly. Delete that file to pick up newly installed fonts.
+    """
+
+    def __init__(self, cache_folder="cache"):
+        self.path = os.path.join(cache_folder, "fonts.json")
+        self.paths = {}
+        self.changed = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == FONT_CACHE_VERSION and data.get("pygame") == pygame.version.ver:
+                self.paths = data["fonts"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def resolve(self, name, bold=False, italic=False):
+        """Path of the font file for a system font name, or None for pygame's default font"""
+        key = f"{name.lower()}|{int(bold)}|{int(italic)}"
+        if key in self.paths:
+            path = self.paths[key]
+            if path is None or os.path.exists(path):
+                return path
+        path = pygame.font.match_font(name, bold, italic)
+        self.paths[key] = path
+        self.changed = True
+        return path
+
+    def font(self, name, size, bold=False, italic=False):
+        """Open a system font like pygame.font.SysFont(), without scanning the system fonts again"""
+        return pygame.font.Font(self.resolve(name, bold, italic), size)
+
+    def save(self):
+        """Write newly resolved fonts to the cache file"""
+        if not self.changed:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"version": FONT_CACHE_VERSION, "pygame": pygame.version.ver,
+                           "fonts": self.paths}, f, indent=2)
+            os.replace(tmp, self.path)
+            self.changed = False
+        except OSError as e:
+            print(f"Warning: Could not save the font cache: {e}")
@@ -0,0 +1,49 @@
+import pygame
+from pygame.locals import NOEVENT
+
+from scheduler import monotonic_ms
+
+
+class FrameScheduler:
+    """Sleep until there is input or a deadline instead of redrawing at a fixed frame rate
+
+    Frames are only produced when an event arrives, when the next deadline the
+    game reported is reached, or while something animates (request_frame()),
+    in which case frames are paced to `max_fps`.
+    """
+
+    def __init__(self, max_fps=60, clock=monotonic_ms):
+        self.frame_ms = 1000 // max(1, max_fps)
+        self.clock = clock
+        self.last_frame = clock()
+        self.frame_requested = False
+        self.wakeups = 0
+
+    def request_frame(self):
+        """Ask for another frame at the animation frame rate"""
+        self.frame_requested = True
+
+    def wait(self, deadline=None):
+        """Block until the next frame is due and return the pending events
+
+        deadline is the tick (in clock milliseconds) at which the game state
+        next changes on its own, or None if only input can change it.
+        """
+        now = self.clock()
+        if self.frame_requested:
+            next_frame = self.last_frame + self.frame_ms
+            deadline = next_frame if deadline is None else min(deadline, next_frame)
+        self.frame_requested = False
+
+        if deadline is None:
+            events = [pygame.event.wait()]
+        elif deadline > now:
+            event = pygame.event.wait(deadline - now)
+            events = [] if event.type == NOEVENT else [event]
+        else:
+            events = []
+        events.extend(pygame.event.get())
+
+        self.last_frame = self.clock()
+        self.wakeups += 1
+        return events
@@ -1,87 +1,106 @@
+import time
+STARTED = time.perf_counter()  # For the startup report; taken before pygame is imported
+
 import pygame
-import random
 import sys
 import os
-import time
+from functools import partial
+from collections import OrderedDict
 from pygame.locals import *
+import animation
+import atlas
+import replay
+import snapshot
+from assets import AssetLoader, create_tile_back
+from config_watch import ConfigWatcher
+from fonts import FontResolver
+from frame_scheduler import FrameScheduler
+from profiler import FrameProfiler
+from renderer import DirtyRectRenderer
+from scheduler import monotonic_ms
+from session import GameSession, VirtualClock
+from surface_cache import BACK, SurfaceCache
+from text_cache import TextCache
 
-class TileMatchingGame:
-    def __init__(self, config=None):
-        # Initialize pygame
-        pygame.init()
-        pygame.font.init()
-        
-        # Default configuration
-        self.default_config = {
-            "window_width": 1024,  # Increased window size to accommodate larger tiles
-            "window_height": 768,
-            "num_levels": 10,
-            "level_duration": 180,  # 3 minutes per level
-            "tile_types": 10,
-            "grid_sizes": [
-                (4, 4),    # Level 1: 4x4 grid
-                (4, 5),    # Level 2: 4x5 grid
-                (5, 6),    # Level 3: 5x6 grid
-                (6, 6),    # Level 4: 6x6 grid
-                (6, 7),    # Level 5: 6x7 grid
-                (7, 8),    # Level 6: 7x8 grid
-                (8, 8),    # Level 7: 8x8 grid
-                (8, 9),    # Level 8: 8x9 grid
-                (9, 10),   # Level 9: 9x10 grid
-                (10, 10)   # Level 10: 10x10 grid
-            ],
-            "secret_texts": [
-                "Level 1 secret text revealed!",
-                "Level 2 secret text revealed!",
-                "Level 3 secret text revealed!",
-                "Level 4 secret text revealed!",
-                "Level 5 secret text revealed!",
-                "Level 6 secret text revealed!",
-                "Level 7 secret text revealed!",
-                "Level 8 secret text revealed!",
-                "Level 9 secret text revealed!",
-                "Final level completed! Congratulations!"
-            ],
-            "assets_folder": "assets",  # Folder where tile images are stored
-            "background_color": (240, 240, 240),
-            "text_color": (10, 10, 10),
-            "highlight_color": (255, 215, 0)  # Gold color for highlighting
-        }
-        
-        # Use provided config or default
-        self.config = config if config else self.default_config
+# Window events after which the OS may have lost the window's contents
+REPAINT_EVENTS = {WINDOWEXPOSED, VIDEOEXPOSE, WINDOWRESTORED, WINDOWSHOWN}
+
+class TileMatchingGame(GameSession):
+    def __init__(self, config=None, clock=None, seed=None):
+        # Frame phase timings, shown on screen with CTRL+P; also times startup
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
+        self.profiler_rect = None
+        
+        # Initialize only the pygame subsystems the game uses
+        with self.profiler.span("pygame_init"):
+            pygame.display.init()
+            pygame.font.init()
+        
+        # Game rules and state. Game time only moves between frames (run() follows
+        # the monotonic clock, replays their recorded ticks), so every event of a
+        # frame is handled at the same tick whether it's played live or replayed
+        if seed is None:
+            seed = (config or {}).get("seed")
+        super().__init__(config, clock=clock or VirtualClock(monotonic_ms()), seed=seed)
         
         # Set up the display
-        self.width = self.config["window_width"]
-        self.height = self.config["window_height"]
-        self.screen = pygame.display.set_mode((self.width, self.height))
-        pygame.display.set_caption("НАЙДИ ПАРУ")
-        
-        # Game state
-        self.state = "start"  # "start", "playing", "level_completing", "level_complete", "game_over", "game_complete"
-        self.current_level = 1
-        self.score = 0
-        self.time_left = self.config["level_duration"]
-        self.start_time = 0
-        self.revealed_texts = [""] * self.config["num_levels"]
-        self.level_complete_delay = 2000  # 2 seconds delay before showing level complete screen
-        self.level_complete_timer = 0
-        
-        # Load fonts
-        self.title_font = pygame.font.SysFont('comicsansms', 40)
-        self.normal_font = pygame.font.SysFont('Arial', 24)
-        self.small_font = pygame.font.SysFont('Arial', 18)
-        
-        # Game grid
-        self.grid = []
-        self.selected_tiles = []
+        with self.profiler.span("set_mode"):
+            self.screen = pygame.display.set_mode((self.width, self.height))
+            pygame.display.set_caption("НАЙДИ ПАРУ")
+        
+        # Load fonts from the files resolved on a previous launch
+        with self.profiler.span("fonts"):
+            fonts = FontResolver(self.config.get("cache_folder", "cache"))
+            self.title_font = fonts.font('comicsansms', 40)
+            self.normal_font = fonts.font('Arial', 24)
+            self.small_font = fonts.font('Arial', 18)
+            fonts.save()
+        
+        # Retained-mode rendering: only tiles and HUD fields that changed get redrawn
+        self.renderer = DirtyRectRenderer(self.screen)
+        self.rendered_state = None
+        self.dirty_tiles = set()
+        self.hud_fields = {}  # field name -> (text, rect) as last drawn
+        
+        # Rendered text, and static screens composited once when their state is entered
+        self.text_cache = TextCache(self.config.get("text_cache_size", 256))
+        self.static_screens = OrderedDict()
+        self.max_static_screens = 3
+        self.completion_overlay = None
+        
+        # Scaled tile surfaces shared between levels
+        self.surface_cache = SurfaceCache(self.config.get("surface_cache_size", 64))
+        
+        # Tile flips and match pulses, started and finished by the session's scheduler,
+        # with their frames baked from the scaled tiles
+        self.animator = animation.Animator(self.scheduler)
+        self.frame_cache = SurfaceCache(self.config.get("frame_cache_size", 512))
         
         # Load tile images
-        self.load_tile_images()
+        with self.profiler.span("load_tile_images"):
+            self.load_tile_images()
+        
+        # Scale the first level's tiles while the start screen is shown
+        self.prewarm_level(1)
+        
+        # Save the session every few seconds, and pick up where a previous run left off
+        self.snapshots = None
+        self.snapshot_key = None  # (state, level) of the last snapshot
+        self.next_snapshot = 0
+        if self.config.get("snapshots", True):
+            path = self.config.get("snapshot_file") or os.path.join(
+                self.config.get("cache_folder", "cache"), "session.snap")
+            self.snapshots = snapshot.SnapshotWriter(path)
+            if self.config.get("resume", True):
+                self.resume_snapshot(path)
+        
+        # Picks up edits to the config file while the game runs, see watch_config()
+        self.config_watcher = None
     
-    def load_tile_images(self):
-        """Load image assets for tiles"""
-        self.tile_images = []
+    def load_tile_images(self, previous=None):
+        """Start decoding image assets for tiles on a worker pool, reusing the images
+        the `previous` asset loader already decoded from the same files"""
         assets_folder = self.config["assets_folder"]
         
         # First check if assets folder exists
@@ -89,182 +108,227 @@ class TileMatchingGame:
             os.makedirs(assets_folder)
             print(f"Created assets folder at {os.path.abspath(assets_folder)}")
             print("Please add your tile images to this folder and restart the game.")
-            print("Images should be named: tile0.png, tile1.png, ..., tile9.png")
-        
-        # Default size for tiles is now larger - we'll resize them in initialize_grid
-        default_tile_size = 200  # Set this as a base size that will be adjusted later
-        
-        # Try to load images tile0.png through tile9.png (or however many are specified)
-        for i in range(self.config["tile_types"]):
-            image_path = os.path.join(assets_folder, f"tile{i}.png")
-            try:
-                image = pygame.image.load(image_path)
-                # Just load the original image, we'll resize when creating the grid
-                self.tile_images.append(image)
-            except pygame.error:
-                # If image not found, create a colored rectangle as fallback
-                color = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
-                         (255, 0, 255), (0, 255, 255), (128, 0, 0), (0, 128, 0),
-                         (0, 0, 128), (128, 128, 0)][i % 10]
-                surface = pygame.Surface((default_tile_size, default_tile_size))
-                surface.fill(color)
-                # Draw the index number on the surface
-                text = self.normal_font.render(str(i), True, (255, 255, 255))
-                text_rect = text.get_rect(center=(default_tile_size//2, default_tile_size//2))
-                surface.blit(text, text_rect)
-                self.tile_images.append(surface)
-                print(f"Warning: Could not load {image_path}, using fallback colored tile")
+            print("Images should be named: tile0.webp, tile1.webp, ... (or .png)")
+        
+        # Images are decoded in the background and picked up by tile_image() on first use
+        self.asset_loader = AssetLoader(assets_folder, self.config["tile_types"], eager=False)
+        if previous is not None:
+            self.asset_loader.adopt(previous)
+        self.tile_images = [None] * self.config["tile_types"]
+        for i in self.asset_loader.missing():
+            print(f"Warning: Could not find an image for tile{i} in {assets_folder}, using fallback colored tile")
         
         # Create back-of-tile image (used when tile is face down)
-        self.tile_back = pygame.Surface((default_tile_size, default_tile_size))
-        self.tile_back.fill((115, 79, 150))  # Purple color
-        inner_rect = pygame.Rect(10, 10, default_tile_size-20, default_tile_size-20)
-        pygame.draw.rect(self.tile_back, (0, 0, 0), inner_rect, 5)  # Border
+        self.tile_back = create_tile_back()
+        self.load_tile_atlas()
+    
+    def load_tile_atlas(self):
+        """Map the tiles baked for the configured images and tile sizes, or bake them"""
+        # Tiles pre-scaled to every level's size on a previous run are mapped from
+        # disk; otherwise decode everything now and bake them for the next launch
+        self.tile_atlas = None
+        if self.config.get("tile_atlas", True):
+            cache_folder = self.config.get("cache_folder", "cache")
+            digest = atlas.atlas_digest(self.config, self.asset_loader.paths)
+            self.tile_atlas = atlas.TileAtlas.load(cache_folder, digest)
+            if self.tile_atlas is None:
+                atlas.bake_in_background(cache_folder, digest, self.asset_loader, self.tile_back,
+                                         atlas.tile_sizes_for_config(self.config))
+        self.surface_cache.atlas = self.tile_atlas
+        if self.tile_atlas is None:
+            self.asset_loader.start()
+    
+    def tile_image(self, i):
+        """Return the source image for a tile type, waiting for it to be decoded if needed"""
+        if i >= len(self.tile_images):
+            # A board dealt before tile_types was lowered by a config reload
+            return self.create_fallback_tile(i)
+        if self.tile_images[i] is None:
+            image = self.asset_loader.image(i)
+            if image is None:
+                image = self.create_fallback_tile(i)
+            self.tile_images[i] = image
+        return self.tile_images[i]
+    
+    def create_fallback_tile(self, i, size=200):
+        """Create a colored rectangle for a tile whose image is missing"""
+        color = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
+                 (255, 0, 255), (0, 255, 255), (128, 0, 0), (0, 128, 0),
+                 (0, 0, 128), (128, 128, 0)][i % 10]
+        surface = pygame.Surface((size, size))
+        surface.fill(color)
+        # Draw the index number on the surface
+        text = self.normal_font.render(str(i), True, (255, 255, 255))
+        text_rect = text.get_rect(center=(size//2, size//2))
+        surface.blit(text, text_rect)
+        return surface
+    
+    def level_tile_keys(self, level, tile_size=None):
+        """List the surface cache keys a level needs, at its own tile size unless zoomed"""
+        cols, rows = self.config["grid_sizes"][level - 1]
+        if tile_size is None:
+            tile_size = self.compute_tile_size(cols, rows)
+        # Only the first pairs_needed tile types appear on a small grid
+        used_types = min((cols * rows) // 2, len(self.tile_images))
+        
+        keys = [(i, tile_size, "face") for i in range(used_types)]
+        keys.append((BACK, tile_size, "back"))
+        return keys
+    
+    def prewarm_level(self, level):
+        """Scale a level's tile images on a background thread"""
+        if level > self.config["num_levels"]:
+            return
+        # The worker waits for images still being decoded; missing ones are left
+        # for initialize_grid() to replace with fallback tiles
+        items = []
+        for key in self.level_tile_keys(level):
+            if key[0] == BACK:
+                items.append((key, self.tile_back))
+            else:
+                items.append((key, partial(self.asset_loader.image, key[0])))
+        self.surface_cache.prewarm(items)
     
     def initialize_grid(self):
-        """Create a grid of tiles for the current level with optimized tile sizes"""
-        cols, rows = self.config["grid_sizes"][self.current_level - 1]
-        
-        # Calculate available space - use more of the screen
-        ui_height = 100  # Space for UI elements (top and bottom)
-        game_area_width = self.width - 40  # 20px padding on each side
-        game_area_height = self.height - ui_height  # Less space for UI
-        
-        # Calculate tile size to maximize usage of available space
-        # Leave a small gap between tiles
-        tile_width = game_area_width // cols - 10
-        tile_height = game_area_height // rows - 10
-        tile_size = min(tile_width, tile_height)
-        
-        # Ensure tiles are reasonably sized
-        tile_size = max(60, min(tile_size, 300))  # Between 60 and 300px
-        
-        # Resize tile images for this level
-        scaled_tile_images = []
-        for image in self.tile_images:
-            scaled_image = pygame.transform.scale(image, (tile_size, tile_size))
-            scaled_tile_images.append(scaled_image)
-        
-        # Save the scaled images for this level
-        self.scaled_tile_images = scaled_tile_images
-        
-        # Also scale the tile back image
-        self.scaled_tile_back = pygame.transform.scale(self.tile_back, (tile_size, tile_size))
-        
-        # Calculate grid offset to center it
-        grid_width = cols * (tile_size + 10) - 10  # Account for gaps between tiles
-        grid_height = rows * (tile_size + 10) - 10
-        self.grid_offset_x = (self.width - grid_width) // 2
-        self.grid_offset_y = (self.height - grid_height) // 2
-        
-        # Create pairs of tiles
-        tile_values = []
-        total_tiles = rows * cols
-        pairs_needed = total_tiles // 2
-        
-        for i in range(pairs_needed):
-            tile_type = i % self.config["tile_types"]
-            tile_values.append(tile_type)
-            tile_values.append(tile_type)
-        
-        # Shuffle tiles
-        random.shuffle(tile_values)
-        
-        # Create grid
-        self.grid = []
-        for r in range(rows):
-            row = []
-            for c in range(cols):
-                index = r * cols + c
-                if index < len(tile_values):
-                    # Position tiles with gaps between them
-                    row.append({
-                        "type": tile_values[index],
-                        "revealed": False,
-                        "matched": False,
-                        "rect": pygame.Rect(
-                            self.grid_offset_x + c * (tile_size + 10), 
-                            self.grid_offset_y + r * (tile_size + 10),
-                            tile_size, tile_size
-                        )
-                    })
-                else:
-                    row.append(None)  # Empty space
-            self.grid.append(row)
-    
-    def handle_click(self, pos):
-        """Handle mouse click on the grid"""
-        if self.state != "playing":
+        """Create a grid of tiles for the current level"""
+        with self.profiler.span("initialize_grid"):
+            super().initialize_grid()
+    
+    def set_board(self, board):
+        """Show a new board, fetching its scaled tile images"""
+        super().set_board(board)
+        self.fetch_scaled_tiles()
+        
+        # A new board needs a full redraw
+        self.dirty_tiles = set()
+        self.animator.clear()
+        self.renderer.invalidate()
+    
+    def fetch_scaled_tiles(self):
+        """Fetch the tile images scaled to the board's current tile size from the cache"""
+        # Only blocks on images that haven't been decoded yet. The tile types come from
+        # the board itself, which may have been dealt under an earlier config
+        size = self.grid.tile_size
+        used_types = max(self.grid.types, default=-1) + 1
+        self.scaled_tile_images = [self.surface_cache.get((i, size, "face"), partial(self.tile_image, i))
+                                   for i in range(used_types)]
+        self.scaled_tile_back = self.surface_cache.get((BACK, size, "back"), self.tile_back)
+    
+    def scroll(self, dx, dy):
+        """Scroll the board view, redrawing the board if it moved"""
+        moved = super().scroll(dx, dy)
+        if moved:
+            self.renderer.invalidate()
+        return moved
+    
+    def zoom(self, factor, anchor=None):
+        """Zoom the board view, rescaling the tiles if their size changed"""
+        zoomed = super().zoom(factor, anchor)
+        if zoomed:
+            self.fetch_scaled_tiles()
+            self.renderer.invalidate()
+        return zoomed
+    
+    def board_clip(self):
+        """Screen area tiles may be drawn in: the view plus room for the match highlight"""
+        return pygame.Rect(self.viewport.rect).inflate(self.grid.gap, self.grid.gap)
+    
+    def mark_tile_dirty(self, r, c):
+        """Schedule a tile to be redrawn on the next frame, animating the change"""
+        self.dirty_tiles.add((r, c))
+        if not self.config.get("animations", True):
             return
-        
-        # Check if a tile was clicked
-        for r in range(len(self.grid)):
-            for c in range(len(self.grid[r])):
-                tile = self.grid[r][c]
-                if tile and tile["rect"].collidepoint(pos):
-                    if not tile["matched"] and not tile["revealed"]:
-                        # Reveal the tile
-                        tile["revealed"] = True
-                        self.selected_tiles.append((r, c))
-                        
-                        # If we've selected 2 tiles, check for a match
-                        if len(self.selected_tiles) == 2:
-                            r1, c1 = self.selected_tiles[0]
-                            r2, c2 = self.selected_tiles[1]
-                            tile1 = self.grid[r1][c1]
-                            tile2 = self.grid[r2][c2]
-                            
-                            if tile1["type"] == tile2["type"]:
-                                # Match!
-                                tile1["matched"] = True
-                                tile2["matched"] = True
-                                self.score += 10 * self.current_level
-                                self.selected_tiles = []
-                                
-                                # Check if level complete
-                                if self.is_level_complete():
-                                    # Set state to level_completing and start the timer
-                                    self.state = "level_completing"
-                                    self.level_complete_timer = pygame.time.get_ticks()
-                                    self.revealed_texts[self.current_level - 1] = self.config["secret_texts"][self.current_level - 1]
-                            else:
-                                # No match, hide tiles after a delay
-                                pygame.time.set_timer(USEREVENT + 1, 1000)  # 1 second delay
-    
-    def is_level_complete(self):
-        """Check if all tiles are matched"""
-        for row in self.grid:
-            for tile in row:
-                if tile and not tile["matched"]:
-                    return False
-        return True
-    
-    def hide_selected_tiles(self):
-        """Hide the currently selected tiles"""
-        for r, c in self.selected_tiles:
-            self.grid[r][c]["revealed"] = False
-        self.selected_tiles = []
+        if self.grid.is_matched(r, c):
+            self.animator.pulse((r, c))
+        else:
+            self.animator.flip((r, c), self.grid.is_revealed(r, c))
+    
+    def tile_area(self, r, c):
+        """Screen area of a tile and the gap around it, where the match highlight is drawn"""
+        return pygame.Rect(self.grid.tile_rect(r, c)).inflate(self.grid.gap, self.grid.gap)
+    
+    def tile_frame(self, tile_type, kind, step=0):
+        """A baked "matched", "pulse" or "flip" frame of a tile, covering its tile_area()"""
+        grid = self.grid
+        background = tuple(self.config["background_color"])
+        highlight = tuple(self.config["highlight_color"])
+        key = (tile_type, grid.tile_size, (kind, step, grid.gap, highlight, background))
+        if kind == "matched":
+            make = partial(animation.bake_matched, self.scaled_tile_images[tile_type], grid.gap,
+                           highlight, background)
+        elif kind == "pulse":
+            make = lambda: animation.bake_pulse(self.tile_frame(tile_type, "matched"), grid.gap, step)
+        else:
+            tile = self.scaled_tile_back if tile_type == BACK else self.scaled_tile_images[tile_type]
+            make = partial(animation.bake_flip, tile, grid.gap, background, step)
+        return self.frame_cache.derive(key, make)
+    
+    def tile_blit(self, r, c):
+        """The surface showing a tile at rest and the position to blit it at"""
+        x, y = self.grid.tile_rect(r, c)[:2]
+        if self.grid.is_matched(r, c):
+            # Baked together with its highlight, so it's one blit instead of a draw and a blit
+            return self.tile_frame(self.grid.type_at(r, c), "matched"), self.tile_area(r, c).topleft
+        if self.grid.is_revealed(r, c):
+            return self.scaled_tile_images[self.grid.type_at(r, c)], (x, y)
+        return self.scaled_tile_back, (x, y)
     
     def draw_grid(self):
-        """Draw the game grid on the screen"""
-        for row in self.grid:
-            for tile in row:
-                if tile:
-                    if tile["matched"]:
-                        # Draw matched tile (with gold highlight)
-                        pygame.draw.rect(self.screen, self.config["highlight_color"], 
-                                        tile["rect"].inflate(10, 10), 3)
-                        self.screen.blit(self.scaled_tile_images[tile["type"]], tile["rect"])
-                    elif tile["revealed"]:
-                        # Draw revealed tile
-                        self.screen.blit(self.scaled_tile_images[tile["type"]], tile["rect"])
-                    else:
-                        # Draw face-down tile
-                        self.screen.blit(self.scaled_tile_back, tile["rect"])
+        """Draw the tiles inside the view; the rest of the board costs nothing"""
+        self.screen.set_clip(self.board_clip())
+        self.screen.blits([self.tile_blit(r, c) for r, c in self.viewport.visible_cells()], doreturn=False)
+        self.screen.set_clip(None)
+        self.dirty_tiles = set()
+    
+    def draw_dirty_tiles(self):
+        """Redraw only the visible tiles that changed since the last frame"""
+        clip = self.board_clip()
+        self.screen.set_clip(clip)
+        blits = []
+        for r, c in self.dirty_tiles:
+            area = self.tile_area(r, c)
+            if not area.colliderect(clip):
+                continue
+            self.screen.fill(self.config["background_color"], area)
+            blits.append(self.tile_blit(r, c))
+            self.renderer.mark(area.clip(clip))
+        self.screen.blits(blits, doreturn=False)
+        self.screen.set_clip(None)
+        self.dirty_tiles = set()
+    
+    def step_animations(self):
+        """Advance the tile animations to the current tick and return the ones playing"""
+        playing, stopped = self.animator.step()
+        # Tiles that stopped animating are drawn at rest again, the playing ones by draw_animations()
+        self.dirty_tiles.update(stopped)
+        self.dirty_tiles.difference_update(cell for cell, _, _ in playing)
+        return playing
+    
+    def draw_animations(self, playing):
+        """Draw the current frame of every playing tile animation with one blits() call"""
+        if not playing:
+            return
+        clip = self.board_clip()
+        blits = []
+        for (r, c), anim, progress in playing:
+            area = self.tile_area(r, c)
+            if not area.colliderect(clip):
+                continue
+            if anim.kind == "flip":
+                face, step = animation.flip_frame(anim, progress)
+                frame = self.tile_frame(self.grid.type_at(r, c) if face else BACK, "flip", step)
+            else:
+                step = animation.pulse_frame(progress)
+                frame = self.tile_frame(self.grid.type_at(r, c), "pulse" if step else "matched", step)
+            blits.append((frame, area.topleft))
+            self.renderer.mark(area.clip(clip))
+        self.screen.set_clip(clip)
+        self.screen.blits(blits, doreturn=False)
+        self.screen.set_clip(None)
     
     def draw_text_centered(self, text, font, color, y_offset):
         """Draw text centered horizontally on the screen"""
-        text_surface = font.render(text, True, color)
+        text_surface = self.text_cache.render(text, font, color)
         text_rect = text_surface.get_rect(center=(self.width // 2, y_offset))
         self.screen.blit(text_surface, text_rect)
     
@@ -277,24 +341,89 @@ class TileMatchingGame:
         self.draw_text_centered("Нажми ПРОБЕЛ, чтобы начать", self.normal_font, self.config["text_color"], 250)
     
     def draw_game_screen(self):
-        """Draw the main game screen"""
-        self.screen.fill(self.config["background_color"])
-        
-        # Draw HUD (Heads Up Display)
+        """Draw the main game screen, redrawing only what changed unless a full redraw is pending"""
+        playing = self.step_animations()
+        if self.renderer.full_redraw:
+            self.screen.fill(self.config["background_color"])
+            self.hud_fields = {}
+            self.draw_hud()
+            self.draw_grid()
+        else:
+            self.draw_hud()
+            self.draw_dirty_tiles()
+        self.draw_animations(playing)
+    
+    def draw_hud(self):
+        """Draw the HUD (Heads Up Display) fields whose text changed"""
         level_text = f"Level: {self.current_level}/{self.config['num_levels']}"
         score_text = f"Score: {self.score}"
         time_text = f"Time: {self.format_time(self.time_left)}"
         
-        level_surface = self.normal_font.render(level_text, True, self.config["text_color"])
-        score_surface = self.normal_font.render(score_text, True, self.config["text_color"])
-        time_surface = self.normal_font.render(time_text, True, self.config["text_color"])
+        self.draw_hud_field("level", level_text, lambda w: 20)
+        self.draw_hud_field("score", score_text, lambda w: self.width // 2 - w // 2)
+        self.draw_hud_field("time", time_text, lambda w: self.width - 20 - w)
+    
+    def draw_hud_field(self, name, text, get_x):
+        """Draw one HUD field if its text changed, clearing what was there before"""
+        previous = self.hud_fields.get(name)
+        if previous and previous[0] == text:
+            return
         
-        self.screen.blit(level_surface, (20, 20))
-        self.screen.blit(score_surface, (self.width // 2 - score_surface.get_width() // 2, 20))
-        self.screen.blit(time_surface, (self.width - 20 - time_surface.get_width(), 20))
+        surface = self.text_cache.render(text, self.normal_font, self.config["text_color"])
+        rect = surface.get_rect(topleft=(get_x(surface.get_width()), 20))
+        area = rect.union(previous[1]) if previous else rect
+        self.screen.fill(self.config["background_color"], area)
+        self.screen.blit(surface, rect)
+        self.renderer.mark(area)
+        self.hud_fields[name] = (text, rect)
+    
+    def draw_completion_overlay(self):
+        """Draw the "level completed" banner over the board"""
+        if self.completion_overlay is None:
+            completion_text = "Уровень пройден!"
+            text_surface = self.text_cache.render(completion_text, self.title_font, (0, 100, 0))
+            text_rect = text_surface.get_rect(center=(self.width // 2, self.height // 2))
+            # Add a semi-transparent background behind the text
+            bg_rect = text_rect.inflate(40, 40)
+            overlay = pygame.Surface((bg_rect.width, bg_rect.height), pygame.SRCALPHA)
+            overlay.fill((255, 255, 255, 180))  # White with 70% opacity
+            overlay.blit(text_surface, text_surface.get_rect(center=overlay.get_rect().center))
+            self.completion_overlay = (overlay, bg_rect)
+        
+        overlay, bg_rect = self.completion_overlay
+        if self.renderer.full_redraw:
+            self.screen.blit(overlay, bg_rect)
+            return
+        # Blend it again only over the tiles redrawn under it; anywhere else it's already there
+        for area in self.renderer.dirty_rects:
+            if area.colliderect(bg_rect):
+                self.screen.set_clip(area)
+                self.screen.blit(overlay, bg_rect)
+        self.screen.set_clip(None)
+    
+    def static_screen_key(self):
+        """Identify what the current static screen shows"""
+        if self.state == "level_complete":
+            return (self.state, self.current_level)
+        if self.state == "game_over":
+            return (self.state, self.score)
+        if self.state == "game_complete":
+            return (self.state, tuple(self.revealed_texts))
+        return (self.state,)
+    
+    def draw_static_screen(self, draw):
+        """Draw a static screen, reusing its composited image if it was shown before"""
+        key = self.static_screen_key()
+        composite = self.static_screens.get(key)
+        if composite is not None:
+            self.static_screens.move_to_end(key)
+            self.screen.blit(composite, (0, 0))
+            return
         
-        # Draw the grid
-        self.draw_grid()
+        draw()
+        self.static_screens[key] = self.screen.copy()
+        if len(self.static_screens) > self.max_static_screens:
+            self.static_screens.popitem(last=False)
     
     def draw_level_complete_screen(self):
         """Draw the level complete screen"""
@@ -341,115 +470,325 @@ class TileMatchingGame:
         seconds = seconds % 60
         return f"{minutes:02d}:{seconds:02d}"
     
-    def next_level(self):
-        """Move to the next level"""
-        self.current_level += 1
-        self.time_left = self.config["level_duration"]
-        self.start_time = pygame.time.get_ticks()
-        self.selected_tiles = []
-        self.initialize_grid()
-        self.state = "playing"
-    
-    def reset_game(self):
-        """Reset the game to start a new session"""
-        self.current_level = 1
-        self.score = 0
-        self.time_left = self.config["level_duration"]
-        self.revealed_texts = [""] * self.config["num_levels"]
-        self.selected_tiles = []
-        self.state = "playing"
-        self.start_time = pygame.time.get_ticks()
-        self.initialize_grid()
-    
-    def update_time(self):
-        """Update the time remaining"""
-        if self.state == "playing":
-            elapsed = (pygame.time.get_ticks() - self.start_time) // 1000
-            self.time_left = max(0, self.config["level_duration"] - elapsed)
-            
-            if self.time_left == 0:
-                self.state = "game_over"
-        
-        # Check if level_completing state should transition to level_complete
-        elif self.state == "level_completing":
-            current_time = pygame.time.get_ticks()
-            if current_time - self.level_complete_timer >= self.level_complete_delay:
-                self.state = "level_complete"
+    def next_deadline(self):
+        """Tick at which the game or a tile animation next changes without input, or None"""
+        deadline = super().next_deadline()
+        boundary = self.animator.next_boundary()
+        if boundary is None:
+            return deadline
+        return boundary if deadline is None else min(deadline, boundary)
     
-    def run(self):
-        """Main game loop"""
-        clock = pygame.time.Clock()
-        running = True
-        
-        while running:
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == QUIT:
-                    running = False
-                
-                elif event.type == KEYDOWN:
-                    if event.key == K_ESCAPE:
-                        running = False
-                    
-                    # Cheat key: CTRL+N to skip level
-                    if event.key == K_n and pygame.key.get_mods() & KMOD_CTRL:
-                        if self.state == "playing":
-                            # Skip to level completing
-                            self.state = "level_completing"
-                            self.level_complete_timer = pygame.time.get_ticks()
-                            self.revealed_texts[self.current_level - 1] = self.config["secret_texts"][self.current_level - 1]
-                    
-                    if event.key == K_SPACE:
-                        if self.state == "start":
-                            self.reset_game()
-                        elif self.state == "level_complete":
-                            if self.current_level < self.config["num_levels"]:
-                                self.next_level()
-                            else:
-                                self.state = "game_complete"
-                        elif self.state == "game_over" or self.state == "game_complete":
-                            self.state = "start"
-                
-                elif event.type == MOUSEBUTTONDOWN:
-                    if event.button == 1:  # Left mouse button
-                        self.handle_click(event.pos)
-                
-                elif event.type == USEREVENT + 1:  # Custom timer for hiding unmatched tiles
-                    pygame.time.set_timer(USEREVENT + 1, 0)  # Cancel the timer
-                    self.hide_selected_tiles()
+    def complete_level(self):
+        """Complete the level, rippling a pulse across the visible tiles from the top left"""
+        super().complete_level()
+        if not self.config.get("animations", True):
+            return
+        now = self.clock()
+        r0, _, c0, _ = self.viewport.visible_range()
+        for r, c in self.viewport.visible_cells():
+            if self.grid.is_matched(r, c):
+                delay = (r - r0 + c - c0) * animation.CLEAR_STAGGER_MS
+                self.animator.pulse((r, c), now + delay)
+    
+    def show_level_complete(self):
+        """End the delay after completing a level"""
+        super().show_level_complete()
+        # Scale the next level's tiles while the player reads the secret
+        self.prewarm_level(self.current_level + 1)
+    
+    def press_space(self):
+        """Advance past the start, level complete and end screens"""
+        super().press_space()
+        if self.state == "start":
+            # Back on the start screen, get the first level ready again
+            self.prewarm_level(1)
+    
+    def draw_profiler_overlay(self):
+        """Draw FPS, frame time percentiles and cache hit rates in the corner"""
+        lines = [
+            f"FPS: {self.profiler.fps()}",
+            f"Frame p50: {self.profiler.percentile(50):.2f} ms  p99: {self.profiler.percentile(99):.2f} ms",
+            f"Tile cache hits: {self.surface_cache.hit_rate():.0%}",
+            f"Text cache hits: {self.text_cache.hit_rate():.0%}",
+            f"Dirty rects: {self.renderer.last_count}",
+        ]
+        surfaces = [self.small_font.render(line, True, (255, 255, 255)) for line in lines]
+        rect = pygame.Rect(20, 60, max(s.get_width() for s in surfaces) + 20,
+                           sum(s.get_height() for s in surfaces) + 20)
+        area = rect.union(self.profiler_rect) if self.profiler_rect else rect
+        
+        self.screen.fill((0, 0, 0), rect)
+        y = rect.y + 10
+        for surface in surfaces:
+            self.screen.blit(surface, (rect.x + 10, y))
+            y += surface.get_height()
+        self.renderer.mark(area)
+        self.profiler_rect = rect
+    
+    def toggle_profiler(self):
+        self.show_profiler = not self.show_profiler
+        if not self.show_profiler:
+            # Redraw whatever the overlay covered
+            self.renderer.invalidate()
+            self.profiler_rect = None
+    
+    def handle_event(self, event):
+        """Handle one input event, as reduced by replay.capture_event()"""
+        if event.type == QUIT:
+            self.running = False
+        
+        elif event.type == KEYDOWN:
+            if event.key == K_ESCAPE:
+                self.running = False
             
-            # Update game state
-            self.update_time()
+            # Cheat key: CTRL+N to skip level
+            if event.key == K_n and event.mod & KMOD_CTRL:
+                # Skip to level completing
+                self.skip_level()
             
-            # Draw the game based on current state
-            if self.state == "start":
-                self.draw_start_screen()
-            elif self.state == "playing":
-                self.draw_game_screen()
-            elif self.state == "level_completing":
-                # During the delay, keep showing the game board with all tiles matched
-                self.draw_game_screen()
-                # Optionally add some visual effect to indicate completion
-                completion_text = "Уровень пройден!"
-                text_surface = self.title_font.render(completion_text, True, (0, 100, 0))
-                text_rect = text_surface.get_rect(center=(self.width // 2, self.height // 2))
-                # Add a semi-transparent background behind the text
-                bg_rect = text_rect.inflate(40, 40)
-                bg_surface = pygame.Surface((bg_rect.width, bg_rect.height), pygame.SRCALPHA)
-                bg_surface.fill((255, 255, 255, 180))  # White with 70% opacity
-                self.screen.blit(bg_surface, bg_rect)
-                self.screen.blit(text_surface, text_rect)
-            elif self.state == "level_complete":
-                self.draw_level_complete_screen()
-            elif self.state == "game_over":
-                self.draw_game_over_screen()
-            elif self.state == "game_complete":
-                self.draw_game_complete_screen()
+            # CTRL+P toggles the performance overlay
+            if event.key == K_p and event.mod & KMOD_CTRL:
+                self.toggle_profiler()
             
-            # Update the display
-            pygame.display.flip()
-            clock.tick(60)  # 60 FPS
+            if event.key == K_SPACE:
+                self.press_space()
+            
+            # Arrow keys scroll boards larger than the screen by one tile
+            step = self.grid.tile_size + self.grid.gap if self.grid else 0
+            if event.key == K_LEFT:
+                self.scroll(-step, 0)
+            elif event.key == K_RIGHT:
+                self.scroll(step, 0)
+            elif event.key == K_UP:
+                self.scroll(0, -step)
+            elif event.key == K_DOWN:
+                self.scroll(0, step)
+        
+        elif event.type == MOUSEWHEEL:
+            if self.grid is None:
+                return
+            if event.mod & KMOD_CTRL:
+                # CTRL+wheel zooms around the mouse pointer
+                self.zoom(1.25 ** event.y, event.pos)
+            else:
+                # The wheel scrolls by a third of a tile per notch, SHIFT scrolls sideways
+                step = max(1, (self.grid.tile_size + self.grid.gap) // 3)
+                dx, dy = event.x * step, -event.y * step
+                if event.mod & KMOD_SHIFT:
+                    dx, dy = dy, dx
+                self.scroll(dx, dy)
+        
+        elif event.type == MOUSEBUTTONDOWN:
+            if event.button == 1:  # Left mouse button
+                self.handle_click(event.pos)
+    
+    def draw_screen(self):
+        """Draw the game based on current state"""
+        # Entering a new state redraws the whole screen, after that only what changed
+        if self.state != self.rendered_state:
+            self.renderer.invalidate()
+            self.rendered_state = self.state
         
+        if self.state == "playing":
+            self.draw_game_screen()
+        elif self.state == "level_completing" and (self.renderer.full_redraw or self.animator
+                                                   or self.animator.stopped):
+            # During the delay, keep showing the game board with all tiles matched
+            # while the level clear wave runs across it, under the banner
+            self.draw_game_screen()
+            self.draw_completion_overlay()
+        elif not self.renderer.full_redraw:
+            # The remaining screens are static until the state changes
+            pass
+        elif self.state == "start":
+            self.draw_static_screen(self.draw_start_screen)
+        elif self.state == "level_complete":
+            self.draw_static_screen(self.draw_level_complete_screen)
+        elif self.state == "game_over":
+            self.draw_static_screen(self.draw_game_over_screen)
+        elif self.state == "game_complete":
+            self.draw_static_screen(self.draw_game_complete_screen)
+        
+        if self.show_profiler:
+            self.draw_profiler_overlay()
+    
+    def run_frame(self, events, render=True):
+        """Handle a frame's events, update the game and draw what changed"""
+        self.profiler.begin_frame()
+        for event in events:
+            self.handle_event(event)
+        self.profiler.lap("events")
+        
+        # Update game state
+        self.update_time()
+        self.profiler.lap("update")
+        
+        if render:
+            self.draw_screen()
+        self.profiler.lap("draw")
+        
+        # Update the display with the changed areas only
+        if render:
+            self.renderer.present()
+        self.profiler.lap("present")
+        self.profiler.end_frame()
+    
+    def resume_snapshot(self, path):
+        """Continue the session saved in a snapshot file, if there is one"""
+        data = snapshot.load(path)
+        if data is None:
+            return
+        try:
+            snapshot.restore(self, data)
+        except (ValueError, KeyError, IndexError) as e:
+            print(f"Warning: Could not resume the saved session: {e}")
+            return
+        self.snapshot_key = (self.state, self.current_level)
+    
+    def save_snapshot(self, force=False):
+        """Snapshot the session when it reaches a new level or state, or every snapshot_interval seconds"""
+        if self.snapshots is None:
+            return
+        if self.state in snapshot.SAVED_STATES:
+            key = (self.state, self.current_level)
+            now = self.clock()
+            if force or key != self.snapshot_key or now >= self.next_snapshot:
+                self.snapshots.submit(snapshot.pack(self))
+                self.snapshot_key = key
+                self.next_snapshot = now + self.config.get("snapshot_interval", 5) * 1000
+        elif self.state in ("game_over", "game_complete") and self.snapshot_key is not None:
+            # Nothing left to resume
+            self.snapshots.delete()
+            self.snapshot_key = None
+    
+    def watch_config(self, path):
+        """Reload the config from path whenever the file changes"""
+        self.config_watcher = ConfigWatcher(path, self.config.get("config_poll_interval", 1000))
+    
+    def apply_config(self, config):
+        """Switch to an edited config, rebuilding only what the changed keys affect"""
+        changed = super().apply_config(config)
+        if not changed:
+            return changed
+        
+        resized = bool(changed & {"window_width", "window_height"})
+        if resized:
+            self.screen = pygame.display.set_mode((self.width, self.height))
+            self.renderer.screen = self.screen
+            self.completion_overlay = None
+        
+        # New images: decode only the files that changed and drop their scaled tiles.
+        # New tile sizes: the cached tiles stay valid, other sizes get scaled on demand
+        if changed & {"tile_types", "assets_folder"}:
+            self.reload_tile_images()
+            if self.grid is not None:
+                self.fetch_scaled_tiles()
+        elif resized or changed & {"grid_sizes", "num_levels"}:
+            self.load_tile_atlas()
+        if changed & {"tile_types", "assets_folder", "grid_sizes", "num_levels"} or resized:
+            self.prewarm_level(1 if self.state == "start" else self.current_level + 1)
+        
+        # Text is only rendered again if its color changed; new texts miss the cache anyway
+        if changed & {"background_color", "text_color"}:
+            self.text_cache.clear()
+        if changed & {"background_color", "text_color", "secret_texts", "num_levels"} or resized:
+            self.static_screens.clear()
+        
+        self.renderer.invalidate()
+        print(f"Reloaded config: {', '.join(sorted(changed))} changed")
+        return changed
+    
+    def reload_tile_images(self):
+        """Switch to the tile images of a changed tile_types or assets_folder"""
+        previous = self.asset_loader
+        self.load_tile_images(previous)
+        # Let the previous loader finish decodes other threads may still wait on
+        previous.shutdown(cancel=False)
+        
+        # Scaled tiles of images that now come from a different file are stale
+        if self.surface_cache.prewarm_thread is not None:
+            self.surface_cache.prewarm_thread.join()
+        old_paths, new_paths = previous.paths, self.asset_loader.paths
+        count = max(len(old_paths), len(new_paths))
+        old_paths = old_paths + [None] * (count - len(old_paths))
+        new_paths = new_paths + [None] * (count - len(new_paths))
+        stale = {i for i in range(count) if old_paths[i] != new_paths[i]}
+        self.surface_cache.discard(stale)
+        self.frame_cache.discard(stale)
+    
+    def print_startup_report(self):
+        """Print how long each startup step took and when the first frame was shown"""
+        print("Startup:")
+        for name, start, duration in self.profiler.spans:
+            print(f"  {name:20s} {duration * 1000:8.1f} ms")
+        print(f"  {'first frame':20s} {(time.perf_counter() - STARTED) * 1000:8.1f} ms after launch")
+    
+    def run(self):
+        """Main game loop"""
+        # Sleep until input or the next deadline instead of redrawing at a fixed rate
+        scheduler = FrameScheduler(self.config.get("max_fps", 60))
+        pygame.event.set_blocked(MOUSEMOTION)  # Nothing reacts to mouse movement
+        pygame.key.set_repeat(300, 40)  # Holding an arrow key keeps scrolling
+        self.running = True
+        
+        # Log every frame's input so the session can be replayed exactly; a resumed
+        # session is replayed from a snapshot of where it starts
+        self.clock.advance_to(monotonic_ms())
+        recorder = None
+        if self.config.get("record_folder"):
+            initial = snapshot.pack(self) if self.state in snapshot.SAVED_STATES else b""
+            recorder = replay.Recorder(replay.session_path(self.config["record_folder"], self.seed),
+                                       self.config, self.seed, self.clock(), initial)
+        
+        # Show the start screen right away instead of waiting for the first event
+        if recorder:
+            recorder.record_frame(self.clock(), [])
+        self.run_frame([])
+        if self.config.get("startup_report"):
+            self.print_startup_report()
+        
+        # Config edits would make a recorded session impossible to replay
+        watcher = None if recorder else self.config_watcher
+        
+        while self.running:
+            deadline = self.next_deadline()
+            if self.show_profiler:
+                # Keep the overlay numbers fresh while the game is idle
+                refresh = monotonic_ms() + 500
+                deadline = refresh if deadline is None else min(deadline, refresh)
+            if watcher:
+                deadline = watcher.next_check if deadline is None else min(deadline, watcher.next_check)
+            if self.animator.playing and self.state in ("playing", "level_completing"):
+                # Animations run at the frame rate while they play; between them
+                # the loop sleeps until next_deadline() reaches the next one
+                scheduler.request_frame()
+            pending = scheduler.wait(deadline)
+            events = [e for e in map(replay.capture_event, pending) if e]
+            if any(event.type in REPAINT_EVENTS for event in pending):
+                # Only dirty rects get pushed after a state's first frame, so a covered
+                # or restored window has to be redrawn in full; not recorded, as the
+                # game state doesn't change
+                self.renderer.invalidate()
+            self.clock.advance_to(monotonic_ms())
+            if watcher:
+                config = watcher.poll()
+                if config is not None:
+                    self.apply_config(config)
+            if recorder:
+                recorder.record_frame(self.clock(), events)
+            self.run_frame(events)
+            self.save_snapshot()
+        
+        if recorder:
+            recorder.close(self)
+        if self.snapshots:
+            self.save_snapshot(force=True)
+            self.snapshots.close()
+        if self.config.get("render_stats"):
+            print(f"Render stats: {self.renderer.stats()}, wakeups: {scheduler.wakeups}")
+        if self.config.get("profile_output"):
+            self.profiler.export(self.config["profile_output"])
+        self.asset_loader.shutdown()
         pygame.quit()
         sys.exit()
 
@@ -467,12 +806,14 @@ def main():
     # Check for command line arguments
     if len(sys.argv) > 1:
         config_file = sys.argv[1]
-        config = load_config_from_file(config_file)
     else:
-        config = load_config_from_file('config.json')  # Use default config
+        config_file = 'config.json'  # Use default config
+    config = load_config_from_file(config_file)
     
-    # Initialize and run the game
+    # Initialize and run the game, picking up edits to the config file as it runs
     game = TileMatchingGame(config)
+    if game.config.get("hot_reload", True):
+        game.watch_config(config_file)
     game.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,228 @@
+"""Headless playouts of the game rules for difficulty tuning
+
+Runs GameSession on a virtual clock with a scripted player, no display needed:
+
+    python headless.py config.json --sessions 10000 --recall 8
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from session import GameSession, VirtualClock
+
+
+class ScriptedPlayer:
+    """Player that clicks tiles using what it remembers of the board
+
+    With recall=None the player remembers every tile it has seen; otherwise
+    only the `recall` most recently seen tiles. Each click takes `click_time`
+    milliseconds.
+    """
+
+    def __init__(self, rng, recall=None, click_time=700):
+        self.rng = rng
+        self.recall = recall
+        self.click_time = click_time
+
+    def start_level(self, board):
+        self.board = board
+        self.memory = {}  # cell index -> tile type of unmatched tiles seen
+        self.order = deque()  # remembered cells, oldest first
+        self.unknown = [i for i, t in enumerate(board.types) if t >= 0]
+        self.unknown_pos = {cell: n for n, cell in enumerate(self.unknown)}
+
+    def forget_unknown(self, i):
+        """Take a cell out of the unknown list (swap-remove, constant time)"""
+        n = self.unknown_pos.pop(i, None)
+        if n is None:
+            return
+        last = self.unknown.pop()
+        if last != i:
+            self.unknown[n] = last
+            self.unknown_pos[last] = n
+
+    def see(self, i, tile_type):
+        """Remember a revealed tile, dropping the oldest memory past the recall limit"""
+        self.forget_unknown(i)
+        if i not in self.memory:
+            self.order.append(i)
+        self.memory[i] = tile_type
+        if self.recall is not None:
+            while len(self.memory) > self.recall:
+                old = self.order.popleft()
+                if self.memory.pop(old, None) is not None:
+                    self.unknown_pos[old] = len(self.unknown)
+                    self.unknown.append(old)
+
+    def matched(self, i):
+        self.forget_unknown(i)
+        self.memory.pop(i, None)
+
+    def pick_unknown(self, exclude):
+        candidates = self.unknown
+        for _ in range(4):
+            i = candidates[self.rng.randrange(len(candidates))]
+            if i != exclude:
+                return i
+        choices = [i for i in candidates if i != exclude]
+        return self.rng.choice(choices) if choices else None
+
+    def choose(self, selected):
+        """Pick the next cell index to click given the cell already selected (or None)"""
+        if selected is None:
+            seen = {}
+            for i, tile_type in self.memory.items():
+                if tile_type in seen:
+                    return seen[tile_type]
+                seen[tile_type] = i
+        else:
+            tile_type = self.board.types[selected]
+            for i, known_type in self.memory.items():
+                if known_type == tile_type and i != selected:
+                    return i
+
+        i = self.pick_unknown(selected) if self.unknown else None
+        if i is None:
+            # Nothing left to explore, fall back to any remembered tile
+            i = next(i for i in self.memory if i != selected)
+        return i
+
+
+def play_session(config, seed, recall=None, click_time=700):
+    """Play one full session headless and return per-level statistics"""
+    clock = VirtualClock()
+    session = GameSession(config, clock=clock, seed=seed)
+    player = ScriptedPlayer(random.Random(seed ^ 0x5EED), recall=recall, click_time=click_time)
+    levels = []
+
+    session.press_space()
+    while session.state not in ("game_over", "game_complete"):
+        if session.state == "playing":
+            board = session.grid
+            player.start_level(board)
+            level_start = clock.now
+            clicks = 0
+
+            while session.state == "playing":
+                if session.hide_deadline is not None:
+                    # Wait for the mismatched tiles to flip back
+                    clock.advance_to(session.hide_deadline)
+                    session.update_time()
+                    continue
+
+                selected = session.selected_tiles[0] if session.selected_tiles else None
+                selected_index = selected[0] * board.cols + selected[1] if selected else None
+                i = player.choose(selected_index)
+                clock.advance(player.click_time)
+                session.update_time()
+                if session.state != "playing":
+                    break
+
+                r, c = divmod(i, board.cols)
+                session.select_tile(r, c)
+                clicks += 1
+                player.see(i, board.types[i])
+                if board.matched[i]:
+                    player.matched(i)
+                    if selected_index is not None:
+                        player.matched(selected_index)
+
+            levels.append({
+                "level": session.current_level,
+                "clicks": clicks,
+                "time_ms": clock.now - level_start,
+                "completed": session.state != "game_over",
+            })
+
+        elif session.state == "level_completing":
+            clock.advance_to(session.next_deadline())
+            session.update_time()
+        else:
+            session.press_space()
+
+    return {
+        "seed": seed,
+        "state": session.state,
+        "score": session.score,
+        "levels_completed": sum(1 for level in levels if level["completed"]),
+        "levels": levels,
+    }
+
+
+def play_batch(config, seeds, recall=None, click_time=700):
+    return [play_session(config, seed, recall, click_time) for seed in seeds]
+
+
+def run_batch(config, sessions, seed=0, recall=None, click_time=700, workers=None, chunk_size=250):
+    """Play many sessions across a process pool; session n uses seed + n"""
+    seeds = list(range(seed, seed + sessions))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(play_batch, config, chunk, recall, click_time) for chunk in chunks]
+        for future in futures:
+            results.extend(future.result())
+    return results
+
+
+def percentile(values, p):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def summarize(results, config):
+    """Per-level click and time percentiles plus completion rate"""
+    summary = {
+        "sessions": len(results),
+        "game_complete": sum(1 for r in results if r["state"] == "game_complete") / max(1, len(results)),
+        "levels": [],
+    }
+    for level in range(1, config["num_levels"] + 1):
+        played = [l for r in results for l in r["levels"] if l["level"] == level]
+        done = [l for l in played if l["completed"]]
+        clicks = [l["clicks"] for l in done]
+        seconds = [l["time_ms"] / 1000 for l in done]
+        summary["levels"].append({
+            "level": level,
+            "grid": list(config["grid_sizes"][level - 1]),
+            "played": len(played),
+            "completion_rate": len(done) / len(played) if played else 0,
+            "clicks_p50": percentile(clicks, 50),
+            "clicks_p90": percentile(clicks, 90),
+            "seconds_p50": percentile(seconds, 50),
+            "seconds_p90": percentile(seconds, 90),
+            "seconds_p99": percentile(seconds, 99),
+        })
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play the game headless with a scripted player")
+    parser.add_argument("config", nargs="?", default="config.json")
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--recall", type=int, default=None, help="tiles the player remembers (default: all)")
+    parser.add_argument("--click-time", type=int, default=700, help="milliseconds per click")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+
+    started = time.perf_counter()
+    results = run_batch(config, args.sessions, args.seed, args.recall, args.click_time, args.workers)
+    elapsed = time.perf_counter() - started
+
+    json.dump(summarize(results, config), sys.stdout, indent=2)
+    print(f"\n{len(results)} sessions in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
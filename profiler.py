@@ -0,0 +1,113 @@
+import json
+import time
+from array import array
+from contextlib import contextmanager
+
+PHASES = ("events", "update", "draw", "present")
+
+
+class FrameProfiler:
+    """Time each phase of the recent frames in a fixed-size ring buffer
+
+    A frame is begin_frame(), one lap() per phase, end_frame(). One-off work
+    such as loading images or building a level is timed with span().
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.frame_starts = array("d", [0.0]) * capacity
+        self.phase_times = {phase: array("d", [0.0]) * capacity for phase in PHASES}
+        self.index = 0
+        self.count = 0
+        self.spans = []  # (name, start, duration) of one-off work
+        self.origin = time.perf_counter()
+        self.last = self.origin
+
+    def begin_frame(self):
+        self.last = time.perf_counter()
+        self.frame_starts[self.index] = self.last
+
+    def lap(self, phase):
+        """Record the time since the previous lap as the duration of phase"""
+        now = time.perf_counter()
+        self.phase_times[phase][self.index] = now - self.last
+        self.last = now
+
+    def end_frame(self):
+        self.index = (self.index + 1) % self.capacity
+        self.count += 1
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((name, start, time.perf_counter() - start))
+
+    def recent_frames(self):
+        """Buffer slots of the recorded frames, oldest first"""
+        n = min(self.count, self.capacity)
+        start = (self.index - n) % self.capacity
+        return [(start + i) % self.capacity for i in range(n)]
+
+    def frame_times(self):
+        return [sum(self.phase_times[phase][i] for phase in PHASES) for i in self.recent_frames()]
+
+    def percentile(self, p):
+        """Frame time percentile in milliseconds"""
+        times = sorted(self.frame_times())
+        if not times:
+            return 0.0
+        return times[min(len(times) - 1, int(p / 100 * len(times)))] * 1000
+
+    def fps(self):
+        """Frames started during the last second"""
+        now = time.perf_counter()
+        return sum(1 for i in self.recent_frames() if now - self.frame_starts[i] <= 1.0)
+
+    def to_dict(self):
+        frames = self.recent_frames()
+        return {
+            "frames": [
+                {"start": self.frame_starts[i] - self.origin,
+                 **{phase: self.phase_times[phase][i] for phase in PHASES}}
+                for i in frames
+            ],
+            "spans": [{"name": name, "start": start - self.origin, "duration": duration}
+                      for name, start, duration in self.spans],
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+        }
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def export_chrome_trace(self, path):
+        """Write the frames and spans in Chrome trace event format (chrome://tracing, Perfetto)"""
+        def event(name, start, duration, tid):
+            return {"name": name, "ph": "X", "pid": 1, "tid": tid,
+                    "ts": (start - self.origin) * 1e6, "dur": duration * 1e6}
+
+        events = []
+        for i in self.recent_frames():
+            start = self.frame_starts[i]
+            phase_start = start
+            for phase in PHASES:
+                duration = self.phase_times[phase][i]
+                events.append(event(phase, phase_start, duration, 1))
+                phase_start += duration
+            events.append(event("frame", start, phase_start - start, 0))
+        for name, start, duration in self.spans:
+            events.append(event(name, start, duration, 2))
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def export(self, path):
+        """Export as a Chrome trace if path ends in .trace.json, plain JSON otherwise"""
+        if path.endswith(".trace.json"):
+            self.export_chrome_trace(path)
+        else:
+            self.export_json(path)
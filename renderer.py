@@ -0,0 +1,62 @@
+import pygame
+from collections import deque
+
+
+class DirtyRectRenderer:
+    """Collect the screen areas that changed during a frame and push only those to the display"""
+
+    def __init__(self, screen, history=600):
+        self.screen = screen
+        self.dirty_rects = []
+        self.full_redraw = True
+        # Number of rects pushed to the display for the last `history` frames
+        # (a full redraw counts as one rect covering the whole screen)
+        self.frame_counts = deque(maxlen=history)
+        self.frames = 0
+        self.idle_frames = 0
+        self.full_redraws = 0
+
+    def invalidate(self):
+        """Request a redraw of the whole screen on the next frame"""
+        self.full_redraw = True
+        self.dirty_rects = []
+
+    def mark(self, rect):
+        """Mark a screen area as changed"""
+        if not self.full_redraw:
+            self.dirty_rects.append(pygame.Rect(rect))
+
+    def present(self):
+        """Push the changed areas to the display and start a new frame"""
+        if self.full_redraw:
+            pygame.display.flip()
+            count = 1
+            self.full_redraws += 1
+        elif self.dirty_rects:
+            pygame.display.update(self.dirty_rects)
+            count = len(self.dirty_rects)
+        else:
+            count = 0
+            self.idle_frames += 1
+
+        self.frame_counts.append(count)
+        self.frames += 1
+        self.full_redraw = False
+        self.dirty_rects = []
+        return count
+
+    @property
+    def last_count(self):
+        """Number of rects pushed to the display in the last frame"""
+        return self.frame_counts[-1] if self.frame_counts else 0
+
+    def stats(self):
+        """Summary of dirty rect counts for the recent frames"""
+        recent = list(self.frame_counts)
+        return {
+            "frames": self.frames,
+            "idle_frames": self.idle_frames,
+            "full_redraws": self.full_redraws,
+            "recent_avg_rects": sum(recent) / len(recent) if recent else 0.0,
+            "recent_max_rects": max(recent) if recent else 0,
+        }
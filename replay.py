@@ -0,0 +1,239 @@
+"""Record input per session and replay it deterministically
+
+A recording holds the session's seed and config (plus a snapshot if the
+session was resumed from one), then one record per frame of the game loop:
+the tick it ran at and the input events it handled. Feeding the frames back
+through the same event handling on a virtual clock reproduces the session
+exactly, in real time or as fast as possible:
+
+    python replay.py recordings/*.rec --headless --workers 4
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pygame
+from pygame.locals import KEYDOWN, MOUSEBUTTONDOWN, MOUSEWHEEL, QUIT
+
+MAGIC = b"CTMREC"
+VERSION = 2
+HEADER = struct.Struct("<HqIII")  # version, seed, start tick, config length, snapshot length
+FRAME = struct.Struct("<BIH")  # tag, ticks since start, event count
+EVENT = struct.Struct("<BIhhhhH")  # kind, key or button, x, y, pointer x, pointer y, modifiers
+END = struct.Struct("<BBHI")  # tag, final state, level, score
+
+TAG_FRAME = 1
+TAG_END = 2
+STATES = ("start", "playing", "level_completing", "level_complete", "game_over", "game_complete")
+
+# Only events the game reacts to are recorded, under small codes
+EVENT_KINDS = {QUIT: 0, KEYDOWN: 1, MOUSEBUTTONDOWN: 2, MOUSEWHEEL: 3}
+EVENT_TYPES = {kind: event_type for event_type, kind in EVENT_KINDS.items()}
+
+
+def capture_event(event):
+    """Reduce a pygame event to the fields the game uses, or None if it ignores the event
+
+    Wheel events get the modifier keys and pointer position at the time they
+    arrived, so handling them never has to ask pygame for live input state.
+    """
+    if event.type == QUIT:
+        return pygame.event.Event(QUIT)
+    if event.type == KEYDOWN:
+        return pygame.event.Event(KEYDOWN, key=event.key, mod=event.mod)
+    if event.type == MOUSEBUTTONDOWN:
+        return pygame.event.Event(MOUSEBUTTONDOWN, button=event.button, pos=event.pos)
+    if event.type == MOUSEWHEEL:
+        return pygame.event.Event(MOUSEWHEEL, x=event.x, y=event.y, mod=pygame.key.get_mods(),
+                                  pos=pygame.mouse.get_pos())
+    return None
+
+
+def pack_event(event):
+    kind = EVENT_KINDS[event.type]
+    if event.type == KEYDOWN:
+        return EVENT.pack(kind, event.key, 0, 0, 0, 0, event.mod)
+    if event.type == MOUSEBUTTONDOWN:
+        return EVENT.pack(kind, event.button, *event.pos, 0, 0, 0)
+    if event.type == MOUSEWHEEL:
+        return EVENT.pack(kind, 0, event.x, event.y, *event.pos, event.mod)
+    return EVENT.pack(kind, 0, 0, 0, 0, 0, 0)
+
+
+def unpack_event(data, offset):
+    kind, code, x, y, px, py, mod = EVENT.unpack_from(data, offset)
+    event_type = EVENT_TYPES[kind]
+    if event_type == KEYDOWN:
+        return pygame.event.Event(KEYDOWN, key=code, mod=mod)
+    if event_type == MOUSEBUTTONDOWN:
+        return pygame.event.Event(MOUSEBUTTONDOWN, button=code, pos=(x, y))
+    if event_type == MOUSEWHEEL:
+        return pygame.event.Event(MOUSEWHEEL, x=x, y=y, mod=mod, pos=(px, py))
+    return pygame.event.Event(QUIT)
+
+
+class Recorder:
+    """Append the frames of one session to a recording file"""
+
+    def __init__(self, path, config, seed, start, initial_snapshot=b""):
+        self.path = path
+        self.start = start
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.file = open(path, "wb")
+        config_data = json.dumps(config, ensure_ascii=False).encode("utf-8")
+        self.file.write(MAGIC + HEADER.pack(VERSION, seed, start, len(config_data), len(initial_snapshot))
+                        + config_data + initial_snapshot)
+
+    def record_frame(self, tick, events):
+        data = [FRAME.pack(TAG_FRAME, tick - self.start, len(events))]
+        data.extend(pack_event(event) for event in events)
+        self.file.write(b"".join(data))
+        # Keep the file whole up to this frame in case the game is killed
+        self.file.flush()
+
+    def close(self, session):
+        """Finish the recording with the session's outcome, which replays are checked against"""
+        self.file.write(END.pack(TAG_END, STATES.index(session.state), session.current_level,
+                                 session.score))
+        self.file.close()
+
+
+def session_path(folder, seed):
+    return os.path.join(folder, f"session-{time.strftime('%Y%m%d-%H%M%S')}-{seed}.rec")
+
+
+class Recording:
+    """A recording read back into memory"""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"{path} is not a recording")
+        offset = len(MAGIC)
+        if offset + HEADER.size > len(data):
+            raise ValueError(f"{path} is cut off in its header")
+        version, self.seed, self.start, config_length, snapshot_length = HEADER.unpack_from(data, offset)
+        if version != VERSION:
+            raise ValueError(f"{path} has unsupported recording version {version}")
+        offset += HEADER.size
+        if offset + config_length + snapshot_length > len(data):
+            raise ValueError(f"{path} is cut off in its header")
+        self.config = json.loads(data[offset:offset + config_length].decode("utf-8"))
+        offset += config_length
+        self.snapshot = data[offset:offset + snapshot_length]  # Where a resumed session started
+        offset += snapshot_length
+
+        self.frames = []  # (tick, events)
+        self.outcome = None  # (state, level, score), missing if the game didn't exit cleanly
+        while offset < len(data):
+            tag = data[offset]
+            if tag == TAG_END:
+                if offset + END.size > len(data):
+                    break  # Cut off in the end record
+                state, level, score = END.unpack_from(data, offset)[1:]
+                self.outcome = (STATES[state], level, score)
+                break
+            if tag != TAG_FRAME:
+                raise ValueError(f"{path} has an unknown record at byte {offset}")
+            if offset + FRAME.size > len(data):
+                break  # Cut off in a frame header
+            _, tick, count = FRAME.unpack_from(data, offset)
+            offset += FRAME.size
+            if offset + count * EVENT.size > len(data):
+                break  # Cut off mid-frame
+            events = [unpack_event(data, offset + i * EVENT.size) for i in range(count)]
+            offset += count * EVENT.size
+            self.frames.append((self.start + tick, events))
+
+
+def replay(path, realtime=False, render=True):
+    """Play a recording back through the game and return a summary of the run"""
+    # Imported here so the game isn't loaded when replay is only used to record
+    from game import TileMatchingGame
+    from session import VirtualClock
+    import snapshot
+
+    recording = Recording(path)
+    clock = VirtualClock(recording.start)
+    # The replay must not pick up or overwrite the player's own saved session
+    config = dict(recording.config, snapshots=False)
+    game = TileMatchingGame(config, clock=clock, seed=recording.seed)
+    if recording.snapshot:
+        snapshot.restore(game, recording.snapshot)
+    game.running = True
+
+    started = time.perf_counter()
+    for tick, events in recording.frames:
+        if realtime:
+            delay = started + (tick - recording.start) / 1000 - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        clock.advance_to(tick)
+        game.run_frame(events, render=render)
+        if not game.running:
+            break
+    elapsed = time.perf_counter() - started
+    game.asset_loader.shutdown()
+
+    outcome = (game.state, game.current_level, game.score)
+    return {
+        "path": path,
+        "frames": len(recording.frames),
+        "outcome": list(outcome),
+        "matches": recording.outcome is None or outcome == recording.outcome,
+        "seconds": elapsed,
+        "frame_p50_ms": game.profiler.percentile(50),
+        "frame_p99_ms": game.profiler.percentile(99),
+    }
+
+
+def replay_batch(paths, realtime=False, render=True):
+    """Replay each recording, reporting one that can't be read instead of stopping the batch"""
+    results = []
+    for path in paths:
+        try:
+            results.append(replay(path, realtime, render))
+        except (OSError, ValueError, struct.error) as e:
+            results.append({"path": path, "error": str(e), "matches": False})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions")
+    parser.add_argument("recordings", nargs="+")
+    parser.add_argument("--realtime", action="store_true", help="replay at the recorded pace")
+    parser.add_argument("--headless", action="store_true", help="use the dummy video driver")
+    parser.add_argument("--no-render", action="store_true", help="skip drawing, run the rules only")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+    render = not args.no_render
+    if args.workers > 1:
+        chunks = [args.recordings[i::args.workers] for i in range(args.workers)]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = [r for batch in pool.map(replay_batch, chunks, [args.realtime] * len(chunks),
+                                               [render] * len(chunks)) for r in batch]
+    else:
+        results = replay_batch(args.recordings, args.realtime, render)
+
+    json.dump(results, sys.stdout, indent=2)
+    unreadable = [r["path"] for r in results if "error" in r]
+    mismatches = [r["path"] for r in results if not r["matches"] and "error" not in r]
+    print(f"\n{len(results) - len(unreadable)} sessions replayed, {len(mismatches)} diverged, "
+          f"{len(unreadable)} unreadable", file=sys.stderr)
+    if mismatches or unreadable:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
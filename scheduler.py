@@ -0,0 +1,79 @@
+import heapq
+import itertools
+import time
+
+
+def monotonic_ms():
+    """Milliseconds from a monotonic clock"""
+    return int(time.monotonic() * 1000)
+
+
+class ScheduledCall:
+    """A callback waiting in a Scheduler; pass it to cancel() to drop it"""
+    __slots__ = ("when", "callback", "args", "cancelled")
+
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Scheduler:
+    """Binary heap of deadlines, fired in order by advance()
+
+    Scheduling is O(log n). Cancelled calls stay in the heap until they reach
+    the top (or the heap is mostly cancelled calls), so cancelling is O(1).
+    TimerWheel has the same call_at/call_later/cancel/advance interface for
+    when many sessions share one set of timers.
+    """
+
+    def __init__(self, clock=monotonic_ms):
+        self.clock = clock
+        self.heap = []  # (when, sequence, call); the sequence keeps equal deadlines in order
+        self.sequence = itertools.count()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def call_at(self, when, callback, *args):
+        """Call callback(*args) once the clock reaches `when` milliseconds"""
+        call = ScheduledCall(when, callback, args)
+        heapq.heappush(self.heap, (when, next(self.sequence), call))
+        self.count += 1
+        return call
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def cancel(self, call):
+        """Drop a pending call; cancelling one that already fired does nothing"""
+        if call.cancelled:
+            return
+        call.cancelled = True
+        self.count -= 1
+        if len(self.heap) > 64 and self.count < len(self.heap) // 2:
+            self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+            heapq.heapify(self.heap)
+
+    def next_deadline(self):
+        """When the next call is due, or None if nothing is scheduled"""
+        heap = self.heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def advance(self, now=None):
+        """Fire every call due by `now` (the clock by default) in deadline order"""
+        if now is None:
+            now = self.clock()
+        heap = self.heap
+        while heap and heap[0][0] <= now:
+            call = heapq.heappop(heap)[2]
+            if call.cancelled:
+                continue
+            # Marked so cancelling it from here on is a no-op
+            call.cancelled = True
+            self.count -= 1
+            call.callback(*call.args)
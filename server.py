@@ -0,0 +1,373 @@
+"""Host many game sessions in one asyncio process behind a small HTTP/JSON protocol
+
+Sessions run the same rules as the desktop game (GameSession) and keep no
+pygame objects. Their deadlines (hiding mismatched tiles, level timeouts,
+the level complete delay, idle expiry) all live on one shared TimerWheel.
+
+    python server.py config.json --port 8765
+    python server.py config.json --port 8765 --load 1000   # load test a running server
+
+Protocol, all bodies JSON:
+
+    POST   /sessions                create a session, optional {"seed": n}
+    GET    /sessions/<id>           current state
+    POST   /sessions/<id>/click     {"row": r, "col": c}
+    POST   /sessions/<id>/space     same as pressing SPACE
+    DELETE /sessions/<id>
+    GET    /stats                   sessions, timers and requests served
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import secrets
+import sys
+import time
+
+from headless import percentile
+from scheduler import monotonic_ms
+from session import GameSession
+from timers import TimerWheel
+
+MAX_BODY = 64 * 1024
+REASONS = {200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or REASONS[status])
+        self.status = status
+
+
+class HostedSession:
+    """A session plus its idle expiry timer"""
+    __slots__ = ("id", "session", "idle_timer")
+
+    def __init__(self, session_id, session):
+        self.id = session_id
+        self.session = session
+        self.idle_timer = None  # Expiry after `session_ttl` without requests
+
+
+class GameServer:
+    def __init__(self, config, clock=monotonic_ms, tick_ms=10, session_ttl=600, max_sessions=10000):
+        self.config = config
+        self.clock = clock
+        self.wheel = TimerWheel(tick_ms, clock=clock)
+        self.session_ttl = session_ttl * 1000
+        self.max_sessions = max_sessions
+        self.sessions = {}
+        self.requests = 0
+        self.index_page = None
+
+    # Sessions
+
+    def create_session(self, seed=None):
+        if len(self.sessions) >= self.max_sessions:
+            raise HTTPError(503, "Too many sessions")
+        session = GameSession(self.config, self.clock, seed, scheduler=self.wheel)
+        hosted = HostedSession(secrets.token_hex(8), session)
+        self.sessions[hosted.id] = hosted
+        self.touch(hosted)
+        return hosted
+
+    def remove_session(self, hosted):
+        hosted.session.cancel_timers()
+        if hosted.idle_timer:
+            self.wheel.cancel(hosted.idle_timer)
+        self.sessions.pop(hosted.id, None)
+
+    def touch(self, hosted):
+        """Push back the idle expiry of a session that was just used"""
+        if hosted.idle_timer:
+            self.wheel.cancel(hosted.idle_timer)
+        hosted.idle_timer = self.wheel.call_later(self.session_ttl, self.remove_session, hosted)
+
+    def session_state(self, hosted):
+        session = hosted.session
+        state = {
+            "id": hosted.id,
+            "state": session.state,
+            "level": session.current_level,
+            "num_levels": self.config["num_levels"],
+            "score": session.score,
+            "time_left": session.time_left,
+        }
+        board = session.grid
+        if board is not None and session.state in ("playing", "level_completing"):
+            # Face-down tiles are null so the client can't peek at them
+            state["rows"] = board.rows
+            state["cols"] = board.cols
+            state["tiles"] = [t if board.revealed[i] or board.matched[i] or t < 0 else None
+                              for i, t in enumerate(board.types)]
+            state["matched"] = [i for i, m in enumerate(board.matched) if m]
+        if session.state in ("level_completing", "level_complete"):
+            state["secret"] = session.revealed_texts[session.current_level - 1]
+        elif session.state == "game_complete":
+            state["secrets"] = session.revealed_texts
+        return state
+
+    # Requests
+
+    def lookup(self, session_id):
+        hosted = self.sessions.get(session_id)
+        if hosted is None:
+            raise HTTPError(404, "No such session")
+        self.touch(hosted)
+        hosted.session.update_time()
+        return hosted
+
+    def handle(self, method, path, body):
+        """Serve one request and return (status, JSON payload or raw bytes)"""
+        self.requests += 1
+        parts = [p for p in path.split("?", 1)[0].split("/") if p]
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(400, "Body is not JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+
+        if not parts:
+            if method != "GET":
+                raise HTTPError(405)
+            return 200, self.index()
+        if parts == ["stats"]:
+            return 200, {"sessions": len(self.sessions), "timers": len(self.wheel),
+                         "requests": self.requests}
+        if parts[0] != "sessions" or len(parts) > 3:
+            raise HTTPError(404)
+
+        if len(parts) == 1:
+            if method != "POST":
+                raise HTTPError(405)
+            seed = data.get("seed")
+            if seed is not None and not isinstance(seed, int):
+                raise HTTPError(400, "seed must be an integer")
+            return 201, self.session_state(self.create_session(seed))
+
+        hosted = self.lookup(parts[1])
+        session = hosted.session
+        if len(parts) == 2:
+            if method == "GET":
+                return 200, self.session_state(hosted)
+            if method == "DELETE":
+                self.remove_session(hosted)
+                return 204, None
+            raise HTTPError(405)
+
+        if method != "POST":
+            raise HTTPError(405)
+        action = parts[2]
+        if action == "click":
+            r, c = data.get("row"), data.get("col")
+            if not isinstance(r, int) or not isinstance(c, int):
+                raise HTTPError(400, "row and col must be integers")
+            board = session.grid
+            if session.state == "playing" and 0 <= r < board.rows and 0 <= c < board.cols \
+                    and board.has_tile(r, c):
+                session.select_tile(r, c)
+        elif action == "space":
+            session.press_space()
+        else:
+            raise HTTPError(404)
+        return 200, self.session_state(hosted)
+
+    def index(self):
+        """The browser version of the game, served as the front page"""
+        if self.index_page is None:
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "index.html")
+            with open(path, "rb") as f:
+                self.index_page = f.read()
+        return self.index_page
+
+    async def read_request(self, reader):
+        """Read one request as (method, target, headers, body), or None once the client hung up
+
+        Raises HTTPError for a malformed request line, header or Content-Length
+        (400) and for a body over MAX_BODY (413).
+        """
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return None
+            parts = request_line.decode("latin-1").split()
+            if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+                raise HTTPError(400, "Malformed request line")
+            method, target, _ = parts
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, separator, value = line.decode("latin-1").partition(":")
+                if not separator:
+                    raise HTTPError(400, "Malformed header")
+                headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            # StreamReader.readline() raises ValueError for lines over its limit
+            raise HTTPError(400, "Request line or header too long")
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length < 0:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(413)
+        body = await reader.readexactly(length) if length else b""
+        return method, target, headers, body
+
+    def respond(self, writer, status, payload, keep_alive):
+        if isinstance(payload, bytes):
+            content, content_type = payload, "text/html; charset=utf-8"
+        else:
+            content = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json"
+        writer.write((
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(content)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        ).encode("latin-1") + content)
+
+    async def handle_connection(self, reader, writer):
+        """Serve HTTP/1.1 requests on one keep-alive connection"""
+        try:
+            while True:
+                try:
+                    request = await self.read_request(reader)
+                except HTTPError as e:
+                    # Where the next request starts is unknown after a bad one, so answer and close
+                    self.respond(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, target, headers, body = request
+                try:
+                    status, payload = self.handle(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self.respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # The client went away
+        finally:
+            writer.close()
+
+    async def run_timers(self):
+        """Advance the timer wheel once per tick"""
+        interval = self.wheel.tick_ms / 1000
+        while True:
+            await asyncio.sleep(interval)
+            self.wheel.advance()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Serving on http://{host}:{port}")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_timers())
+
+
+async def request(reader, writer, method, path, data=None):
+    """Send one request on a keep-alive connection and return (status, JSON payload)"""
+    body = json.dumps(data).encode("utf-8") if data is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n"
+                 .encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    content = await reader.readexactly(length) if length else b""
+    return status, json.loads(content) if content else None
+
+
+async def load_client(host, port, clicks, seed, latencies):
+    """One player: create a session, start it and click random tiles"""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        async def timed(method, path, data=None):
+            started = time.perf_counter()
+            result = await request(reader, writer, method, path, data)
+            latencies.append(time.perf_counter() - started)
+            return result
+
+        _, state = await timed("POST", "/sessions", {"seed": seed})
+        path = f"/sessions/{state['id']}"
+        _, state = await timed("POST", path + "/space")
+        for _ in range(clicks):
+            if state["state"] != "playing":
+                _, state = await timed("POST", path + "/space")
+                continue
+            r, c = rng.randrange(state["rows"]), rng.randrange(state["cols"])
+            _, state = await timed("POST", path + "/click", {"row": r, "col": c})
+        await timed("DELETE", path)
+    finally:
+        writer.close()
+
+
+async def load_test(host, port, clients, clicks, concurrency=500):
+    """Run `clients` simulated players against a running server and report latency"""
+    latencies = []
+    limit = asyncio.Semaphore(concurrency)
+
+    async def client(seed):
+        async with limit:
+            await load_client(host, port, clicks, seed, latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(seed) for seed in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "seconds": elapsed,
+        "requests_per_second": len(latencies) / elapsed,
+        "latency_p50_ms": percentile(latencies, 50) * 1000,
+        "latency_p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host game sessions over HTTP")
+    parser.add_argument("config", nargs="?", default="config.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--session-ttl", type=int, default=600, help="seconds before an idle session is dropped")
+    parser.add_argument("--max-sessions", type=int, default=10000)
+    parser.add_argument("--load", type=int, metavar="CLIENTS", help="load test a running server instead")
+    parser.add_argument("--clicks", type=int, default=50, help="clicks per load test client")
+    args = parser.parse_args()
+
+    if args.load:
+        result = asyncio.run(load_test(args.host, args.port, args.load, args.clicks))
+        json.dump(result, sys.stdout, indent=2)
+        print()
+        return
+
+    with open(args.config, "r") as f:
+        config = json.load(f)
+    server = GameServer(config, session_ttl=args.session_ttl, max_sessions=args.max_sessions)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+import random
+
+from board import Board, compute_tile_size, generate_tile_values
+from config_watch import diff_config
+from scheduler import Scheduler, monotonic_ms
+from viewport import Viewport
+
+# Default configuration
+DEFAULT_CONFIG = {
+    "window_width": 1024,  # Increased window size to accommodate larger tiles
+    "window_height": 768,
+    "num_levels": 10,
+    "level_duration": 180,  # 3 minutes per level
+    "tile_types": 10,
+    "grid_sizes": [
+        (4, 4),    # Level 1: 4x4 grid
+        (4, 5),    # Level 2: 4x5 grid
+        (5, 6),    # Level 3: 5x6 grid
+        (6, 6),    # Level 4: 6x6 grid
+        (6, 7),    # Level 5: 6x7 grid
+        (7, 8),    # Level 6: 7x8 grid
+        (8, 8),    # Level 7: 8x8 grid
+        (8, 9),    # Level 8: 8x9 grid
+        (9, 10),   # Level 9: 9x10 grid
+        (10, 10)   # Level 10: 10x10 grid
+    ],
+    "secret_texts": [
+        "Level 1 secret text revealed!",
+        "Level 2 secret text revealed!",
+        "Level 3 secret text revealed!",
+        "Level 4 secret text revealed!",
+        "Level 5 secret text revealed!",
+        "Level 6 secret text revealed!",
+        "Level 7 secret text revealed!",
+        "Level 8 secret text revealed!",
+        "Level 9 secret text revealed!",
+        "Final level completed! Congratulations!"
+    ],
+    "assets_folder": "assets",  # Folder where tile images are stored
+    "background_color": (240, 240, 240),
+    "text_color": (10, 10, 10),
+    "highlight_color": (255, 215, 0)  # Gold color for highlighting
+}
+
+
+class VirtualClock:
+    """Clock that only moves when told to, for headless runs and replays"""
+
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, ms):
+        self.now += ms
+
+    def advance_to(self, tick):
+        self.now = max(self.now, tick)
+
+
+class GameSession:
+    """Rules and state machine of one game, with no display or pygame dependency
+
+    Time comes from `clock`, a function returning milliseconds, so sessions can
+    run headless on a virtual clock. `seed` makes the tile shuffles repeatable.
+    Every deadline (hiding a mismatch, the level timeout, the level complete
+    delay) is a call on `scheduler`, a Scheduler of its own unless one shared
+    with other sessions is passed in. TileMatchingGame extends this with
+    drawing and input handling.
+    """
+
+    def __init__(self, config=None, clock=None, seed=None, scheduler=None):
+        # Use provided config or default
+        self.default_config = DEFAULT_CONFIG
+        self.config = config if config else self.default_config
+        self.pending_config = None  # A reloaded config waiting for the running game to end
+        self.clock = clock or monotonic_ms
+        self.scheduler = scheduler if scheduler is not None else Scheduler(self.clock)
+        self.timers = {}  # name -> pending scheduled call
+        # Every session has a seed, so recordings can replay its shuffles
+        self.seed = seed if seed is not None else random.randrange(1 << 62)
+        self.rng = random.Random(self.seed)
+
+        # Screen size the board is laid out for
+        self.width = self.config["window_width"]
+        self.height = self.config["window_height"]
+
+        # Game state
+        self.state = "start"  # "start", "playing", "level_completing", "level_complete", "game_over", "game_complete"
+        self.current_level = 1
+        self.score = 0
+        self.time_left = self.config["level_duration"]
+        self.start_time = 0
+        self.revealed_texts = [""] * self.config["num_levels"]
+        self.level_complete_delay = 2000  # 2 seconds delay before showing level complete screen
+        self.mismatch_delay = 1000  # Mismatched tiles stay visible for 1 second
+
+        # Game grid
+        self.grid = None  # Board for the current level
+        # Screen area the board is shown in, below the HUD; boards larger than it scroll
+        self.viewport = self.create_viewport()
+        self.selected_tiles = []
+
+    def create_viewport(self):
+        return Viewport(20, 50, self.width - 40, self.height - 50)
+
+    def compute_tile_size(self, cols, rows):
+        """Calculate the tile size that fits a cols x rows grid on the screen"""
+        return compute_tile_size(self.width, self.height, cols, rows)
+
+    def initialize_grid(self):
+        """Create a grid of tiles for the current level with optimized tile sizes"""
+        cols, rows = self.config["grid_sizes"][self.current_level - 1]
+
+        # Create pairs of tiles and shuffle them into the grid
+        tile_values = generate_tile_values(cols, rows, self.config["tile_types"], self.rng)
+        self.set_board(Board(rows, cols, tile_values))
+
+    def set_board(self, board):
+        """Make board the current grid, laid out to fit the screen"""
+        board.tile_size = self.compute_tile_size(board.cols, board.rows)
+        board.gap = 10
+        self.grid = board
+
+        # Center the grid in the view, or start at its top left corner if it doesn't fit
+        self.viewport.attach(self.grid)
+
+    @property
+    def grid_offset_x(self):
+        """Screen position of the board's left edge, following scrolling and zooming"""
+        return self.grid.offset_x
+
+    @property
+    def grid_offset_y(self):
+        """Screen position of the board's top edge, following scrolling and zooming"""
+        return self.grid.offset_y
+
+    def handle_click(self, pos):
+        """Handle mouse click on the grid"""
+        if self.state != "playing":
+            return
+
+        # Map the click straight to the tile under it; tiles scrolled out of view can't be hit
+        if not self.viewport.contains(*pos):
+            return
+        cell = self.grid.cell_at(*pos)
+        if cell is not None:
+            self.select_tile(*cell)
+
+    def select_tile(self, r, c):
+        """Reveal a tile and check for a match once two are selected"""
+        if self.state != "playing":
+            return
+        if self.grid.is_matched(r, c):
+            return
+        if "hide" in self.timers:
+            # Clicking on while a mismatched pair is showing turns the pair face down
+            # right away, so selections never stack up past two tiles
+            self.hide_selected_tiles()
+        elif self.grid.is_revealed(r, c):
+            return
+
+        # Reveal the tile
+        self.grid.reveal(r, c)
+        self.selected_tiles.append((r, c))
+        self.mark_tile_dirty(r, c)
+
+        # If we've selected 2 tiles, check for a match
+        if len(self.selected_tiles) == 2:
+            r1, c1 = self.selected_tiles[0]
+            r2, c2 = self.selected_tiles[1]
+
+            if self.grid.type_at(r1, c1) == self.grid.type_at(r2, c2):
+                # Match!
+                self.grid.match(r1, c1)
+                self.grid.match(r2, c2)
+                self.mark_tile_dirty(r1, c1)
+                self.mark_tile_dirty(r2, c2)
+                self.score += 10 * self.current_level
+                self.selected_tiles = []
+
+                # Check if level complete
+                if self.is_level_complete():
+                    self.complete_level()
+            else:
+                # No match, hide tiles after a delay
+                self.set_timer("hide", self.clock() + self.mismatch_delay, self.hide_selected_tiles)
+
+    def scroll(self, dx, dy):
+        """Scroll the board view by (dx, dy) pixels; True if it moved"""
+        if self.state != "playing":
+            return False
+        return self.viewport.scroll(dx, dy)
+
+    def zoom(self, factor, anchor=None):
+        """Zoom the board view around anchor (a screen position); True if the tile size changed"""
+        if self.state != "playing":
+            return False
+        return self.viewport.zoom(factor, anchor)
+
+    def complete_level(self):
+        """Reveal the level's secret and start the delay before the level complete screen"""
+        self.state = "level_completing"
+        self.cancel_timers()
+        self.set_timer("level_complete", self.clock() + self.level_complete_delay, self.show_level_complete)
+        if self.current_level <= self.config["num_levels"]:
+            self.revealed_texts[self.current_level - 1] = self.config["secret_texts"][self.current_level - 1]
+
+    def show_level_complete(self):
+        """End the delay after completing a level"""
+        self.state = "level_complete"
+
+    def time_up(self):
+        """The level timer ran out"""
+        self.time_left = 0
+        self.state = "game_over"
+        self.cancel_timers()
+
+    def is_level_complete(self):
+        """Check if all tiles are matched"""
+        return self.grid.is_complete()
+
+    def hide_selected_tiles(self):
+        """Hide the currently selected tiles"""
+        for r, c in self.selected_tiles:
+            self.grid.hide(r, c)
+            self.mark_tile_dirty(r, c)
+        self.selected_tiles = []
+        self.cancel_timer("hide")
+
+    def mark_tile_dirty(self, r, c):
+        """Called whenever a tile changes state; nothing to redraw without a display"""
+
+    def skip_level(self):
+        """Cheat: complete the current level right away"""
+        if self.state == "playing":
+            self.complete_level()
+
+    def press_space(self):
+        """Advance past the start, level complete and end screens"""
+        if self.state == "start":
+            self.reset_game()
+        elif self.state == "level_complete":
+            # A level past the configured count ends the game instead of indexing past grid_sizes
+            if self.current_level < self.config["num_levels"]:
+                self.next_level()
+            else:
+                self.state = "game_complete"
+        elif self.state == "game_over" or self.state == "game_complete":
+            self.state = "start"
+            if self.pending_config is not None:
+                self.apply_config(self.pending_config)
+
+    def next_level(self):
+        """Move to the next level"""
+        self.current_level += 1
+        self.time_left = self.config["level_duration"]
+        self.start_time = self.clock()
+        self.selected_tiles = []
+        self.start_level_timer()
+        self.initialize_grid()
+        self.state = "playing"
+
+    def reset_game(self):
+        """Reset the game to start a new session"""
+        self.current_level = 1
+        self.score = 0
+        self.time_left = self.config["level_duration"]
+        self.revealed_texts = [""] * self.config["num_levels"]
+        self.selected_tiles = []
+        self.state = "playing"
+        self.start_time = self.clock()
+        self.start_level_timer()
+        self.initialize_grid()
+
+    def start_level_timer(self):
+        """Drop the previous level's deadlines and start the clock on this one"""
+        self.cancel_timers()
+        self.set_timer("timeout", self.start_time + self.config["level_duration"] * 1000, self.time_up)
+
+    def set_timer(self, name, when, callback):
+        """Call callback at tick `when`, replacing the pending timer of the same name"""
+        self.cancel_timer(name)
+        self.timers[name] = self.scheduler.call_at(when, self.fire_timer, name, callback)
+
+    def fire_timer(self, name, callback):
+        del self.timers[name]
+        callback()
+
+    def cancel_timer(self, name):
+        timer = self.timers.pop(name, None)
+        if timer is not None:
+            self.scheduler.cancel(timer)
+
+    def cancel_timers(self):
+        for name in list(self.timers):
+            self.cancel_timer(name)
+
+    @property
+    def hide_deadline(self):
+        """When the mismatched selected tiles get hidden, or None"""
+        timer = self.timers.get("hide")
+        return timer.when if timer else None
+
+    def restore(self, level, score, revealed_texts, board, elapsed_ms, completed):
+        """Continue a saved session: back on its level with `elapsed_ms` of the level used,
+        or on the level complete screen if the level was already done"""
+        self.cancel_timers()
+        self.current_level = level
+        self.score = score
+        self.revealed_texts = revealed_texts
+        self.selected_tiles = []
+        self.set_board(board)
+        if completed:
+            self.show_level_complete()
+        else:
+            self.state = "playing"
+            self.start_time = self.clock() - elapsed_ms
+            self.time_left = max(0, self.config["level_duration"] - elapsed_ms // 1000)
+            self.start_level_timer()
+
+    def apply_config(self, config):
+        """Switch to a new config without interrupting the session; returns the changed keys
+
+        The board being played keeps its size and tiles; new grid sizes apply
+        from the next level on. A config with fewer levels than the one being
+        played is held back until the game ends.
+        """
+        if self.state in ("playing", "level_completing", "level_complete") \
+                and config["num_levels"] < self.current_level:
+            print(f"Warning: num_levels {config['num_levels']} is below the level being played "
+                  f"({self.current_level}); the new config applies once this game ends")
+            self.pending_config = config
+            return set()
+        self.pending_config = None
+        changed = diff_config(self.config, config)
+        self.config = config
+
+        if "num_levels" in changed:
+            levels = config["num_levels"]
+            self.revealed_texts = (self.revealed_texts + [""] * levels)[:levels]
+        if "secret_texts" in changed:
+            self.revealed_texts = [config["secret_texts"][i] if text else ""
+                                   for i, text in enumerate(self.revealed_texts)]
+        if "level_duration" in changed and "timeout" in self.timers:
+            self.set_timer("timeout", self.start_time + config["level_duration"] * 1000, self.time_up)
+        if changed & {"window_width", "window_height"}:
+            self.width = config["window_width"]
+            self.height = config["window_height"]
+            self.viewport = self.create_viewport()
+            if self.grid is not None:
+                self.set_board(self.grid)
+        return changed
+
+    def update_time(self):
+        """Fire the deadlines that have passed and update the time remaining"""
+        self.scheduler.advance()
+        if self.state == "playing":
+            elapsed = (self.clock() - self.start_time) // 1000
+            self.time_left = max(0, self.config["level_duration"] - elapsed)
+
+    def next_deadline(self):
+        """Tick at which the game state next changes without input, or None if only input changes it"""
+        deadlines = [timer.when for timer in self.timers.values()]
+        if self.state == "playing":
+            # The HUD clock shows whole seconds
+            elapsed = (self.clock() - self.start_time) // 1000
+            deadlines.append(self.start_time + (elapsed + 1) * 1000)
+        return min(deadlines) if deadlines else None
@@ -0,0 +1,149 @@
+"""Compact binary snapshots of an in-progress session, for resuming after a crash
+
+A snapshot is a fixed header (magic, version, CRC-32 of the rest) followed by
+the session fields, which levels' secrets were revealed, the board's tile
+types and matched flags, and the state of the tile shuffling RNG. Tiles face
+up without being matched aren't saved; they come back face down.
+"""
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+
+from board import Board
+
+MAGIC = b"CTMSNAP"
+VERSION = 1
+HEAD = struct.Struct("<7sHI")  # magic, version, CRC-32 of everything after the header
+BODY = struct.Struct("<qBHIIHHHH")  # seed, completed, level, score, elapsed ms, rows, cols, levels, RNG words
+SAVED_STATES = ("playing", "level_completing", "level_complete")
+
+
+def pack(session):
+    """Serialize a session that is on a level (state in SAVED_STATES)"""
+    board = session.grid
+    types, matched = board.pack()
+    completed = session.state != "playing"
+    elapsed = 0 if completed else max(0, session.clock() - session.start_time)
+    revealed = bytes(1 if text else 0 for text in session.revealed_texts)
+    rng = array("I", session.rng.getstate()[1])
+    if sys.byteorder == "big":
+        rng.byteswap()
+
+    body = b"".join((
+        BODY.pack(session.seed, completed, session.current_level, session.score, elapsed,
+                  board.rows, board.cols, len(revealed), len(rng)),
+        revealed, types, matched, rng.tobytes(),
+    ))
+    return HEAD.pack(MAGIC, VERSION, zlib.crc32(body)) + body
+
+
+def restore(session, data):
+    """Put a session back into the state saved in data; raises ValueError if data is unusable"""
+    if len(data) < HEAD.size + BODY.size:
+        raise ValueError("snapshot is truncated")
+    magic, version, crc = HEAD.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a snapshot")
+    if version != VERSION:
+        raise ValueError(f"unsupported snapshot version {version}")
+    body = memoryview(data)[HEAD.size:]
+    if zlib.crc32(body) != crc:
+        raise ValueError("snapshot is corrupt")
+
+    seed, completed, level, score, elapsed, rows, cols, levels, rng_words = BODY.unpack_from(body)
+    config = session.config
+    if levels != config["num_levels"] or not 1 <= level <= levels:
+        raise ValueError("snapshot was saved with a different level setup")
+
+    offset = BODY.size
+    cells = rows * cols
+    sizes = (levels, 2 * cells, cells, 4 * rng_words)
+    if offset + sum(sizes) != len(body):
+        raise ValueError("snapshot is truncated")
+    parts = []
+    for size in sizes:
+        parts.append(bytes(body[offset:offset + size]))
+        offset += size
+    revealed, types, matched, rng_data = parts
+
+    rng = array("I")
+    rng.frombytes(rng_data)
+    if sys.byteorder == "big":
+        rng.byteswap()
+    session.seed = seed
+    session.rng.setstate((3, tuple(rng), None))
+
+    revealed_texts = [config["secret_texts"][i] if flag else "" for i, flag in enumerate(revealed)]
+    board = Board.unpack(rows, cols, types, matched)
+    session.restore(level, score, revealed_texts, board, elapsed, bool(completed))
+
+
+class SnapshotWriter:
+    """Write snapshots to one file on a background thread
+
+    Only the latest snapshot waiting to be written is kept. Each write goes to
+    a temporary file that is synced and then renamed over the snapshot, so a
+    crash leaves either the old snapshot or the new one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.pending = None  # Bytes to write, or b"" to delete the snapshot
+        self.closing = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.work, name="snapshot-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, data):
+        with self.condition:
+            self.pending = data
+            self.condition.notify()
+
+    def delete(self):
+        self.submit(b"")
+
+    def close(self):
+        """Finish the pending write and stop the thread"""
+        with self.condition:
+            self.closing = True
+            self.condition.notify()
+        self.thread.join()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closing:
+                    self.condition.wait()
+                data, self.pending = self.pending, None
+                if data is None:
+                    return
+            try:
+                if data:
+                    self.write(data)
+                elif os.path.exists(self.path):
+                    os.remove(self.path)
+            except OSError as e:
+                print(f"Warning: Could not save the session snapshot: {e}")
+
+    def write(self, data):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+def load(path):
+    """Read a snapshot file, or None if there isn't one"""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,129 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import CancelledError
+
+import pygame
+
+BACK = -1  # Tile type used for the back-of-tile image
+
+
+class SurfaceCache:
+    """Scaled tile surfaces converted to the display format, keyed by (tile type, size, variant)
+
+    Least recently used entries are evicted once `max_entries` is reached.
+    Entries can be built on a background thread with prewarm(). A source can be
+    a surface or a callable returning one, so images still being decoded are
+    only waited for when an entry actually has to be built. Entries found in the
+    baked tile atlas are taken from it instead of being scaled.
+    """
+
+    def __init__(self, max_entries=64, atlas=None):
+        self.max_entries = max_entries
+        self.atlas = atlas
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prewarm_thread = None
+
+    def get(self, key, source):
+        """Return the cached surface for key, scaling source to key's size on a miss"""
+        with self.lock:
+            surface = self.entries.get(key)
+            if surface is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return surface
+            self.misses += 1
+
+        surface = self.create(key, source)
+        self.store(key, surface)
+        return surface
+
+    def derive(self, key, make):
+        """Return the cached surface for key, building it with make() on a miss
+
+        For surfaces made from other cached ones, like the baked animation frames.
+        """
+        with self.lock:
+            surface = self.entries.get(key)
+            if surface is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return surface
+            self.misses += 1
+
+        surface = self.convert(make(), False)
+        self.store(key, surface)
+        return surface
+
+    def contains(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def store(self, key, surface):
+        with self.lock:
+            self.entries[key] = surface
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def discard(self, tile_types):
+        """Drop the entries of the given tile types, whose source images changed"""
+        with self.lock:
+            for key in [key for key in self.entries if key[0] in tile_types]:
+                del self.entries[key]
+
+    def create(self, key, source):
+        """Build the surface for key from the atlas if it has it, otherwise by scaling source"""
+        baked = self.atlas.lookup(key) if self.atlas else None
+        if baked is not None:
+            surface, opaque = baked
+            return self.convert(surface, not opaque)
+        if callable(source):
+            source = source()
+        if source is None:
+            return None
+        return self.build(source, key[1])
+
+    def build(self, source, size):
+        """Scale a source image and convert it to the display pixel format"""
+        surface = pygame.transform.scale(source, (size, size))
+        return self.convert(surface, surface.get_flags() & pygame.SRCALPHA)
+
+    def convert(self, surface, alpha):
+        if pygame.display.get_surface() is None:
+            # No display yet (or running headless), nothing to convert to
+            return surface
+        if alpha:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def prewarm(self, items):
+        """Build the given (key, source) entries on a background thread"""
+        items = [(key, source) for key, source in items if not self.contains(key)]
+        if not items:
+            return None
+
+        def work():
+            for key, source in items:
+                if self.contains(key):
+                    continue
+                try:
+                    surface = self.create(key, source)
+                except CancelledError:
+                    return  # The asset loader was shut down
+                if surface is not None:
+                    self.store(key, surface)
+
+        self.prewarm_thread = threading.Thread(target=work, name="tile-prewarm", daemon=True)
+        self.prewarm_thread.start()
+        return self.prewarm_thread
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
@@ -0,0 +1,38 @@
+from collections import OrderedDict
+
+
+class TextCache:
+    """Rendered text surfaces keyed by (string, font, color)
+
+    Least recently used entries are evicted once `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, font, color):
+        """Return the rendered surface for text, rendering it only on a miss"""
+        # Colors loaded from config.json are lists
+        key = (text, font, tuple(color))
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.entries.clear()
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
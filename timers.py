@@ -0,0 +1,87 @@
+import itertools
+
+from scheduler import monotonic_ms
+
+
+def deadline_order(timer):
+    return (timer.when, timer.sequence)
+
+
+class Timer:
+    """A callback scheduled on a TimerWheel; pass it to cancel() to drop it"""
+    __slots__ = ("when", "sequence", "tick", "callback", "args")
+
+    def __init__(self, when, sequence, tick, callback, args):
+        self.when = when
+        self.sequence = sequence  # Keeps timers with equal deadlines in the order they were set
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+
+
+class TimerWheel:
+    """Hashed timing wheel for many deadlines driven by one periodic advance()
+
+    Time is cut into ticks of `tick_ms`; a timer lives in slot tick % slots,
+    and one further round of the wheel passes for every `slots` ticks it lies
+    ahead. Scheduling and cancelling are O(1), and advancing costs one slot
+    per elapsed tick plus the timers that fire.
+    """
+
+    def __init__(self, tick_ms=10, slots=512, clock=monotonic_ms):
+        self.tick_ms = tick_ms
+        self.clock = clock
+        self.slots = [set() for _ in range(slots)]
+        self.current = clock() // tick_ms  # Last tick whose timers have fired
+        self.sequence = itertools.count()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def call_at(self, when, callback, *args):
+        """Call callback(*args) once the clock reaches `when` milliseconds"""
+        tick = max(-(-when // self.tick_ms), self.current + 1)
+        timer = Timer(when, next(self.sequence), tick, callback, args)
+        self.slots[tick % len(self.slots)].add(timer)
+        self.count += 1
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def cancel(self, timer):
+        """Drop a pending timer; cancelling one that already fired does nothing"""
+        slot = self.slots[timer.tick % len(self.slots)]
+        if timer in slot:
+            slot.remove(timer)
+            self.count -= 1
+
+    def advance(self, now=None):
+        """Fire every timer due by `now` (the clock by default) in deadline order
+
+        Timers sharing a tick fire by deadline, then in the order they were set.
+        """
+        target = (self.clock() if now is None else now) // self.tick_ms
+        n = len(self.slots)
+        while self.current < target and self.count:
+            if target - self.current > n:
+                # A long jump passes every slot at least once; fire the due timers
+                # of all of them at once instead of walking tick by tick
+                due = sorted((t for slot in self.slots for t in slot if t.tick <= target),
+                             key=deadline_order)
+                self.current = target
+            else:
+                self.current += 1
+                slot = self.slots[self.current % n]
+                due = sorted((t for t in slot if t.tick <= self.current), key=deadline_order)
+            for timer in due:
+                self.fire(timer)
+        self.current = max(self.current, target)
+
+    def fire(self, timer):
+        slot = self.slots[timer.tick % len(self.slots)]
+        if timer in slot:  # An earlier callback may have cancelled it
+            slot.remove(timer)
+            self.count -= 1
+            timer.callback(*timer.args)
@@ -0,0 +1,95 @@
+class Viewport:
+    """Scrollable, zoomable window onto a Board, with no pygame dependency
+
+    The viewport is the screen rectangle (x, y, width, height) the board is
+    drawn into. Scrolling and zooming move the board's offsets and change its
+    tile size, so Board.tile_rect() and Board.cell_at() keep working in
+    screen coordinates. A board smaller than the view is centered in it.
+    """
+
+    def __init__(self, x, y, width, height, min_tile_size=16, max_tile_size=300):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.min_tile_size = min_tile_size
+        self.max_tile_size = max_tile_size
+        self.board = None
+        self.base_tile_size = 0
+        self.base_gap = 0
+
+    @property
+    def rect(self):
+        return (self.x, self.y, self.width, self.height)
+
+    def contains(self, x, y):
+        return self.x <= x < self.x + self.width and self.y <= y < self.y + self.height
+
+    def attach(self, board):
+        """Show a new board at its own tile size, centered or scrolled to its top left corner"""
+        self.board = board
+        self.base_tile_size = board.tile_size
+        self.base_gap = board.gap
+        board.offset_x = self.x
+        board.offset_y = self.y
+        self.clamp()
+
+    def visible_range(self):
+        """Rows and columns (r0, r1, c0, c1) of the board inside the view"""
+        return self.board.visible_range(self.x, self.y, self.width, self.height)
+
+    def visible_cells(self):
+        return self.board.visible_cells(self.x, self.y, self.width, self.height)
+
+    def clamp_axis(self, offset, start, length, count):
+        pitch = self.board.tile_size + self.board.gap
+        extent = count * pitch - self.board.gap
+        if extent <= length:
+            return start + (length - extent) // 2
+        # Never scroll past the board's edges
+        return min(start, max(offset, start + length - extent))
+
+    def clamp(self):
+        board = self.board
+        board.offset_x = self.clamp_axis(board.offset_x, self.x, self.width, board.cols)
+        board.offset_y = self.clamp_axis(board.offset_y, self.y, self.height, board.rows)
+
+    def scroll(self, dx, dy):
+        """Move the view over the board by (dx, dy) pixels; True if anything moved"""
+        board = self.board
+        before = (board.offset_x, board.offset_y)
+        board.offset_x -= dx
+        board.offset_y -= dy
+        self.clamp()
+        return (board.offset_x, board.offset_y) != before
+
+    def zoom(self, factor, anchor=None):
+        """Scale the tiles by factor, keeping the board point under anchor in place
+
+        The anchor defaults to the center of the view. Returns True if the tile
+        size changed.
+        """
+        board = self.board
+        # The whole board fitting in the view is as far as zooming out goes
+        pitch = min(self.width // board.cols, self.height // board.rows)
+        fit = pitch * self.base_tile_size // max(1, self.base_tile_size + self.base_gap)
+        low = min(self.base_tile_size, max(self.min_tile_size, fit))
+        high = max(self.base_tile_size, self.max_tile_size)
+        tile_size = max(low, min(high, int(round(board.tile_size * factor))))
+        if tile_size == board.tile_size:
+            return False
+
+        ax, ay = anchor if anchor else (self.x + self.width // 2, self.y + self.height // 2)
+        pitch = board.tile_size + board.gap
+        # Board position under the anchor, in tiles
+        u = (ax - board.offset_x) / pitch
+        v = (ay - board.offset_y) / pitch
+
+        board.tile_size = tile_size
+        # Gaps shrink and grow with the tiles
+        board.gap = max(1, round(self.base_gap * tile_size / self.base_tile_size))
+        pitch = tile_size + board.gap
+        board.offset_x = int(round(ax - u * pitch))
+        board.offset_y = int(round(ay - v * pitch))
+        self.clamp()
+        return True